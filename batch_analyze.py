@@ -0,0 +1,281 @@
+"""Analyse game collections in parallel and write annotated PGN and JSONL.
+
+Games are streamed from PGN files or game archives, their positions are
+sharded across a process pool and searched to a fixed depth or node budget
+with multi-PV output. Finished positions are kept in a JSONL results cache,
+so re-running over a growing collection only analyses new positions.
+
+    python batch_analyze.py games.pgn --depth 4 --multipv 3 --pgn-out annotated.pgn --jsonl-out analysis.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from evaluation import params_checksum
+from game_archive import ENGINE_VERSION, RESULT_BLACK_WINS, RESULT_DRAW, RESULT_WHITE_WINS, ArchiveReader
+from movegen import clear_move_cache, new_board, opponent, play_move
+from notation import START_FEN, board_from_fen, board_to_fen, move_to_san, read_pgn, san_to_move, write_pgn
+from search import MATE_BOUND, MATE_SCORE, Search
+
+ARCHIVE_RESULTS = {RESULT_WHITE_WINS: "1-0", RESULT_BLACK_WINS: "0-1", RESULT_DRAW: "1/2-1/2"}
+
+# Seeds the search's tie-breaks, so the same position always gets the same analysis
+ANALYSIS_SEED = 20240601
+
+
+class AnalysisGame:
+    def __init__(self, headers, start_fen, moves, result, note=None):
+        self.headers = headers
+        self.start_fen = start_fen
+        self.moves = moves  # SAN of the moves that could be replayed
+        self.result = result
+        self.note = note  # Why replay stopped early, if it did
+        self.fens = []  # Position before each move, then the final position
+        self.played = []  # (start, end) of each replayed move
+
+
+# Game sources
+def games_from_pgn(path):
+    with open(path) as f:
+        for game in read_pgn(f):
+            yield AnalysisGame(game.headers, game.headers.get("FEN", START_FEN), game.moves, game.result)
+
+
+def games_from_archive(path):
+    with ArchiveReader(path) as archive:
+        for record in archive.iter_games():
+            board, player, moves = new_board(), "white", []
+            for start, end, _ in record.moves:
+                moves.append(move_to_san(board, player, (start, end)))
+                play_move(board, start, end)
+                player = opponent(player)
+            clear_move_cache()
+            result = ARCHIVE_RESULTS.get(record.result, "*")
+            headers = {"Event": "Self-play", "Round": str(record.game_id), "Result": result}
+            yield AnalysisGame(headers, START_FEN, moves, result)
+
+
+def read_games(paths):
+    for path in paths:
+        if path.endswith(".pgn"):
+            yield from games_from_pgn(path)
+        else:
+            yield from games_from_archive(path)
+
+
+# Replay a game and record the FEN of every position; stops at moves the engine cannot play
+def collect_positions(game):
+    board, player = board_from_fen(game.start_fen)
+    game.fens = [board_to_fen(board, player)]
+    game.played = []
+    for ply, san in enumerate(game.moves):
+        try:
+            move = san_to_move(board, player, san)
+        except ValueError as error:
+            game.note = f"analysis stops at ply {ply + 1}: {error}"
+            game.moves = game.moves[:ply]
+            break
+        game.played.append(move)
+        play_move(board, *move)
+        player = opponent(player)
+        game.fens.append(board_to_fen(board, player))
+    clear_move_cache()
+
+
+# Worker process
+_engine = None
+_budget = None
+
+
+def _init_worker(depth, nodes, multipv):
+    global _engine, _budget
+    _engine = Search(rng=random.Random(ANALYSIS_SEED))
+    _budget = (depth, nodes, multipv)
+
+
+def analyse_position(fen):
+    """Search one position; return (fen, lines, nodes, seconds, worker pid).
+
+    Each line is [best move SAN, score in centipawns for white, depth reached].
+    """
+    depth, nodes, multipv = _budget
+    board, player = board_from_fen(fen)
+    started = time.perf_counter()
+    # Keep results independent of the order positions arrive in
+    _engine.tt.clear()
+    _engine.rng.seed(ANALYSIS_SEED)
+    results = _engine.multipv(board, player, multipv, depth, max_nodes=nodes)
+    total_nodes = _engine.nodes
+    lines = []
+    for move, score, reached in results:
+        white_score = score if player == "white" else -score
+        lines.append([move_to_san(board, player, move), white_score, reached])
+    clear_move_cache()
+    return fen, lines, total_nodes, time.perf_counter() - started, os.getpid()
+
+
+def format_eval(score):
+    """Score in PGN %eval style: pawns, or #N / #-N for mates (in moves)."""
+    if score > MATE_BOUND:
+        return f"#{(MATE_SCORE - score + 1) // 2}"
+    if score < -MATE_BOUND:
+        return f"#-{(MATE_SCORE + score + 1) // 2}"
+    return f"{score / 100:.2f}"
+
+
+class ResultsCache:
+    """Analysed positions keyed by FEN and search budget, persisted as JSON lines.
+
+    The budget key should also name the engine and evaluation, so analyses
+    from an older search or different tuned parameters are not reused.
+    """
+
+    def __init__(self, path, budget_key):
+        self.path = path
+        self.budget_key = budget_key
+        self.results = {}
+        if path and os.path.exists(path):
+            with open(path, "rb+") as f:
+                good = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # Half-written when a run was interrupted
+                    good += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    self.results[entry["key"]] = entry["lines"]
+                f.truncate(good)
+        self.file = open(path, "a") if path else None
+
+    def key(self, fen):
+        return f"{fen}|{self.budget_key}"
+
+    def get(self, fen):
+        return self.results.get(self.key(fen))
+
+    def put(self, fen, lines):
+        key = self.key(fen)
+        self.results[key] = lines
+        if self.file:
+            self.file.write(json.dumps({"key": key, "lines": lines}) + "\n")
+            self.file.flush()
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def write_outputs(games, cache, first_index, pgn_out, jsonl_out):
+    for offset, game in enumerate(games):
+        comments = {}
+        for ply, fen in enumerate(game.fens):
+            lines = cache.get(fen)
+            if jsonl_out:
+                record = {
+                    "game": first_index + offset,
+                    "ply": ply,
+                    "fen": fen,
+                    "played": game.moves[ply] if ply < len(game.moves) else None,
+                    "best": lines[0][0] if lines else None,
+                    "eval_cp": lines[0][1] if lines else None,
+                    "multipv": [{"move": move, "eval_cp": score, "depth": depth} for move, score, depth in lines or []],
+                }
+                jsonl_out.write(json.dumps(record) + "\n")
+            if ply == 0 or not lines:
+                continue
+            # The comment after a move gives the evaluation of the position it led to
+            comment = f"[%eval {format_eval(lines[0][1])}]"
+            before = cache.get(game.fens[ply - 1])
+            if before and _best_move(game.fens[ply - 1], before[0][0]) != game.played[ply - 1]:
+                comment += f" best: {before[0][0]} ({format_eval(before[0][1])})"
+            comments[ply - 1] = comment
+        clear_move_cache()
+        if pgn_out:
+            headers = dict(game.headers)
+            if game.note:
+                headers["Annotator"] = f"batch_analyze ({game.note})"
+            write_pgn(pgn_out, headers, game.moves, game.result, comments)
+
+
+# Compare moves, not SAN strings: the PGN may spell the played move differently (e.g. without "+")
+def _best_move(fen, san):
+    board, player = board_from_fen(fen)
+    return san_to_move(board, player, san)
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="PGN files (.pgn) or game archives")
+    parser.add_argument("--depth", type=int, default=4, help="search depth per position")
+    parser.add_argument("--nodes", type=int, help="node budget per PV line (depth then acts as a cap)")
+    parser.add_argument("--multipv", type=int, default=1, help="number of best moves to report")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-games", type=int, default=64, help="games read and written per batch")
+    parser.add_argument("--cache", default="analysis_cache.jsonl", help="results cache ('' to disable)")
+    parser.add_argument("--pgn-out", help="annotated PGN output")
+    parser.add_argument("--jsonl-out", help="per-position JSONL output")
+    args = parser.parse_args()
+    if not args.pgn_out and not args.jsonl_out:
+        parser.error("give --pgn-out and/or --jsonl-out")
+
+    budget_key = f"n{args.nodes}d{args.depth}" if args.nodes else f"d{args.depth}"
+    cache = ResultsCache(args.cache, f"{budget_key}m{args.multipv}v{ENGINE_VERSION}e{params_checksum()}")
+    pgn_out = open(args.pgn_out, "w") if args.pgn_out else None
+    jsonl_out = open(args.jsonl_out, "w") if args.jsonl_out else None
+    worker_stats = {}  # pid -> [positions, seconds, nodes]
+    analysed = skipped = game_count = 0
+    started = time.perf_counter()
+
+    with multiprocessing.Pool(args.workers, _init_worker, (args.depth, args.nodes, args.multipv)) as pool:
+        for games in _batches(read_games(args.inputs), args.batch_games):
+            pending = set()
+            for game in games:
+                collect_positions(game)
+                for fen in game.fens:
+                    if cache.get(fen) is None:
+                        pending.add(fen)
+                    else:
+                        skipped += 1
+            for fen, lines, nodes, seconds, pid in pool.imap_unordered(analyse_position, sorted(pending), chunksize=4):
+                cache.put(fen, lines)
+                stats = worker_stats.setdefault(pid, [0, 0.0, 0])
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] += nodes
+                analysed += 1
+            write_outputs(games, cache, game_count, pgn_out, jsonl_out)
+            game_count += len(games)
+            print(f"{game_count} games, {analysed} positions analysed, {skipped} from cache", file=sys.stderr)
+
+    elapsed = time.perf_counter() - started
+    for pid, (positions, seconds, nodes) in sorted(worker_stats.items()):
+        rate = positions / seconds if seconds else 0.0
+        nps = nodes / seconds if seconds else 0.0
+        print(f"worker {pid}: {positions} positions, {rate:.2f} positions/s, {nps:.0f} nodes/s", file=sys.stderr)
+    print(f"total: {analysed} positions in {elapsed:.1f}s ({analysed / elapsed if elapsed else 0:.2f} positions/s)",
+          file=sys.stderr)
+    for f in (pgn_out, jsonl_out):
+        if f:
+            f.close()
+    cache.close()
+
+
+if __name__ == "__main__":
+    main()
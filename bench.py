@@ -0,0 +1,104 @@
+"""Deterministic search benchmark.
+
+Searches a fixed set of positions to a fixed depth with seeded randomness
+and a fresh transposition table per position. The total node count is a
+signature of the engine's behaviour: any change that should not alter the
+search (a faster move generator, cheaper check detection) must leave it
+unchanged, on every machine. Nodes per second is the speed to compare.
+The built-in evaluation parameters are used unless --params names a tuned
+file, so a local eval_params.json does not change the signature.
+
+    python bench.py                      # wall-clock timing only
+    python bench.py --profile bench.pstats
+    python bench.py --depth 5 --disable null_move,late_move_reductions
+    python bench.py --params eval_params.json
+"""
+import argparse
+import cProfile
+import pstats
+import random
+import time
+
+import evaluation
+from notation import board_from_fen, move_to_san
+from search import Search, SearchOptions
+
+BENCH_SEED = 20240601
+DEFAULT_DEPTH = 4
+
+# Openings, middlegames and endgames; the game has no castling or en passant, so those FEN fields are unused
+BENCH_POSITIONS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w - - 0 1",
+    "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w - - 0 1",
+    "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w - - 0 1",
+    "r2q1rk1/pp2bppp/2np1n2/2p1p3/4P3/2PP1N2/PP1NBPPP/R2Q1RK1 b - - 0 1",
+    "2rq1rk1/pb1nbppp/1p2pn2/2pp4/3P4/1P1BPN2/PBPN1PPP/2RQ1RK1 w - - 0 1",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 1",
+    "6k1/5pp1/7p/8/8/7P/5PP1/3R2K1 w - - 0 1",
+    "8/2k5/3p4/p2P1p2/P2P1P2/8/8/5K2 w - - 0 1",
+    "8/8/4k3/8/2p5/8/B2K4/8 w - - 0 1",
+    "4r1k1/pp3pp1/7p/3q4/3P4/P4Q1P/1P3PP1/4R1K1 w - - 0 1",
+    "2r3k1/pp3ppp/2n1b3/3p4/3P4/2PB1N2/P4PPP/2R3K1 w - - 0 1",
+]
+
+
+def parse_disabled(text):
+    names = [name.strip() for name in text.split(",") if name.strip()]
+    options = SearchOptions()
+    for name in names:
+        if not hasattr(options, name):
+            raise ValueError(f"unknown search option: {name}")
+        setattr(options, name, False)
+    return options
+
+
+def run_bench(depth=DEFAULT_DEPTH, options=None, verbose=True):
+    """Search every bench position; return (total nodes, elapsed seconds)."""
+    total_nodes, total_time = 0, 0.0
+    for i, fen in enumerate(BENCH_POSITIONS, 1):
+        board, player = board_from_fen(fen)
+        engine = Search(rng=random.Random(BENCH_SEED), options=options)
+        started = time.perf_counter()
+        move, score, reached = engine.search(board, player, depth)
+        elapsed = time.perf_counter() - started
+        total_nodes += engine.nodes
+        total_time += elapsed
+        if verbose:
+            best = move_to_san(board, player, move) if move else "(none)"
+            print(f"position {i:2}/{len(BENCH_POSITIONS)}: depth {reached} best {best:7} score {score:6} "
+                  f"nodes {engine.nodes:8} time {elapsed:6.2f}s")
+    return total_nodes, total_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--disable", default="", help="comma-separated SearchOptions to switch off")
+    parser.add_argument("--profile", metavar="PATH", help="run under cProfile and write pstats data to PATH")
+    parser.add_argument("--params", metavar="PATH", help="evaluation parameters to bench instead of the built-in ones")
+    args = parser.parse_args()
+
+    options = parse_disabled(args.disable)
+    evaluation.reset_params()
+    if args.params:
+        evaluation.load_params(args.params)
+    if args.profile:
+        profile = cProfile.Profile()
+        profile.enable()
+        nodes, elapsed = run_bench(args.depth, options)
+        profile.disable()
+        profile.dump_stats(args.profile)
+        pstats.Stats(profile).sort_stats("tottime").print_stats(15)
+    else:
+        nodes, elapsed = run_bench(args.depth, options)
+
+    print("=" * 40)
+    print(f"Total time (ms) : {elapsed * 1000:.0f}")
+    print(f"Nodes searched  : {nodes}")
+    print(f"Nodes/second    : {nodes / elapsed if elapsed else 0:.0f}")
+    print(f"Eval params     : {args.params or 'built-in'} (crc {evaluation.params_checksum()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import math
+import random
+import sys
+
+import pygame
+
+from movegen import clear_move_cache, legal_moves, new_board, opponent, play_move, position_hash
+from profiling import profiler
+
+# Colors
+WHITE = (255, 255, 255)
+BROWN = (139, 69, 19)
+GRID_BACKGROUND = (40, 40, 40)
+
+# Gap in pixels between neighbouring boards
+BOARD_GAP = 4
+
+PIECE_NAMES = [f"{color}_{piece_type}" for color in ("white", "black")
+               for piece_type in ("pawn", "knight", "bishop", "rook", "queen", "king")]
+
+
+# Piece sprites and empty boards, scaled once per square size
+class SpriteCache:
+    def __init__(self, image_dir="images"):
+        self.originals = {name: pygame.image.load(f"{image_dir}/{name}.png") for name in PIECE_NAMES}
+        self.sprites = {}  # (name, square size) -> scaled surface
+        self.backgrounds = {}  # square size -> checkered 8x8 surface
+
+    def sprite(self, color, piece_type, square_size):
+        key = (f"{color}_{piece_type}", square_size)
+        surface = self.sprites.get(key)
+        if surface is None:
+            surface = pygame.transform.smoothscale(self.originals[key[0]], (square_size, square_size))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha()
+            self.sprites[key] = surface
+        return surface
+
+    def background(self, square_size):
+        surface = self.backgrounds.get(square_size)
+        if surface is None:
+            surface = pygame.Surface((square_size * 8, square_size * 8))
+            for row in range(8):
+                for col in range(8):
+                    color = WHITE if (row + col) % 2 == 0 else BROWN
+                    surface.fill(color, (col * square_size, row * square_size, square_size, square_size))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+            self.backgrounds[square_size] = surface
+        return surface
+
+
+# Many boards laid out in a grid on one surface
+class GridView:
+    """Render ``count`` boards side by side, redrawing only boards whose position changed."""
+
+    def __init__(self, surface, count, sprites=None, columns=None):
+        self.surface = surface
+        self.sprites = sprites or SpriteCache()
+        self.columns = columns or math.ceil(math.sqrt(count))
+        rows = math.ceil(count / self.columns)
+        width, height = surface.get_size()
+        cell = min(width // self.columns, height // rows)
+        self.square_size = max(1, (cell - BOARD_GAP) // 8)
+        board_size = self.square_size * 8
+        self.cells = []
+        for i in range(count):
+            row, col = divmod(i, self.columns)
+            rect = pygame.Rect(col * cell, row * cell, board_size, board_size)
+            self.cells.append(surface.subsurface(rect))
+        self.drawn = [None] * count  # Position hash last drawn into each cell
+        surface.fill(GRID_BACKGROUND)
+
+    def draw_board(self, index, board):
+        """Draw one board into its cell and return the dirty screen rect."""
+        cell = self.cells[index]
+        size = self.square_size
+        cell.blit(self.sprites.background(size), (0, 0))
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece:
+                    cell.blit(self.sprites.sprite(piece.color, piece.type, size), (col * size, row * size))
+        offset = cell.get_abs_offset()
+        return pygame.Rect(offset, cell.get_size())
+
+    def draw(self, boards):
+        """Redraw the boards whose position changed since the last call; return their dirty rects."""
+        dirty = []
+        for i, board in enumerate(boards):
+            key = position_hash(board, "white")
+            if key != self.drawn[i]:
+                self.drawn[i] = key
+                dirty.append(self.draw_board(i, board))
+        return dirty
+
+    def invalidate(self):
+        """Force every board to be redrawn on the next draw()."""
+        self.drawn = [None] * len(self.cells)
+
+
+# Watch random self-play games side by side
+def main(count=64, width=1024, height=1024, moves_per_frame=4):
+    pygame.init()
+    screen = pygame.display.set_mode((width, height))
+    pygame.display.set_caption(f"Chess Game - {count} boards")
+    view = GridView(screen, count)
+    games = [[new_board(), "white"] for _ in range(count)]
+    clock = pygame.time.Clock()
+    pygame.display.flip()
+    turn = 0
+
+    while True:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                profiler.toggle()
+
+        # Advance a few games per frame, round robin, restarting finished ones
+        with profiler.timer("grid_moves"):
+            for _ in range(moves_per_frame):
+                game = games[turn % count]
+                turn += 1
+                board, player = game
+                moves = [(start, end) for start, ends in legal_moves(board, player).items() for end in ends]
+                if not moves:
+                    game[0], game[1] = new_board(), "white"
+                    continue
+                play_move(board, *random.choice(moves))
+                clear_move_cache()
+                game[1] = opponent(player)
+
+        with profiler.timer("grid_draw"):
+            dirty = view.draw([board for board, _ in games])
+        pygame.display.update(dirty)
+        frame_time = clock.tick(60)
+        if profiler.enabled:
+            profiler.record_frame(frame_time / 1000.0)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 64)
@@ -1,6 +1,14 @@
 import pygame
+import os
 import sys
 import random
+import time
+
+from game_archive import PROMOTES_TO_QUEEN, RESULT_BLACK_WINS, RESULT_UNKNOWN, RESULT_WHITE_WINS, ArchiveWriter
+from movegen import clear_move_cache, is_checkmate, is_king_in_check, legal_moves, position_hash
+from position_cache import PositionCache
+from profiling import profiler
+from search import Search
 
 pygame.init()
 
@@ -14,6 +22,23 @@ BLACK = (0, 0, 0)
 BROWN = (139, 69, 19)
 YELLOW = (255, 255, 0)
 LIGHT_YELLOW = (255, 255, 153)
+GREEN = (60, 160, 60)
+
+# Profiling: set CHESS_PROFILE=1 to start with instrumentation on, press P to toggle it while playing
+PROFILE_JSON = "chess_profile.json"
+PROFILE_STATS = "chess_profile.pstats"
+
+# Seconds the computer may think about each move, and the deepest it searches
+ENGINE_MOVE_TIME = 1.0
+ENGINE_MAX_DEPTH = 32
+
+# Every game is appended to this archive when it ends (set CHESS_ARCHIVE to change it)
+ARCHIVE_PATH = os.environ.get("CHESS_ARCHIVE", "games.chessarc")
+
+# Set CHESS_POSITION_CACHE to a file path to keep search results between sessions;
+# a cached move is played without searching if it was found at least this deep
+POSITION_CACHE_PATH = os.environ.get("CHESS_POSITION_CACHE")
+POSITION_CACHE_MIN_DEPTH = 4
 
 # Initialize screen
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -50,6 +75,7 @@ board = [[None for _ in range(8)] for _ in range(8)]
 # Selected piece
 selected_piece = None
 selected_pos = None
+selected_moves = []  # Legal destinations of the selected piece
 
 # Current player
 current_player = "white"
@@ -58,6 +84,14 @@ current_player = "white"
 last_move_start = None
 last_move_end = None
 
+# The computer's search; its transposition table carries over from move to move
+engine = Search()
+position_cache = PositionCache(POSITION_CACHE_PATH) if POSITION_CACHE_PATH else None
+
+# Moves of the current game and the seed the computer's random choices were drawn from
+game_moves = []
+game_seed = 0
+
 # Initialize game state
 def init_board():
     """Set up the initial chessboard."""
@@ -86,6 +120,14 @@ def draw_board():
     if last_move_end:
         pygame.draw.rect(screen, LIGHT_YELLOW, (last_move_end[1] * SQUARE_SIZE, last_move_end[0] * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
 
+    # Mark where the selected piece can go: a dot for quiet moves, a ring for captures
+    for row, col in selected_moves:
+        center = (col * SQUARE_SIZE + SQUARE_SIZE // 2, row * SQUARE_SIZE + SQUARE_SIZE // 2)
+        if board[row][col]:
+            pygame.draw.circle(screen, GREEN, center, SQUARE_SIZE // 2 - 2, 4)
+        else:
+            pygame.draw.circle(screen, GREEN, center, SQUARE_SIZE // 6)
+
 # Draw pieces
 def draw_pieces():
     """Draw chess pieces on the board."""
@@ -95,233 +137,139 @@ def draw_pieces():
             if piece:
                 screen.blit(piece.image, (col * SQUARE_SIZE, row * SQUARE_SIZE))
 
-# Check if the king is in check
-def is_king_in_check(board, player_color):
-    king_pos = find_king(board, player_color)
-    if not king_pos:
-        return True  # King is captured
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece.color != player_color:
-                if can_attack(piece, (row, col), king_pos, board):
-                    return True
-    return False
-
-# Get the position of the king for the given player color
-def find_king(board, player_color):
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece.color == player_color and piece.type == "king":
-                return (row, col)
-    return None
-
-# Check if a piece can attack a target position
-def can_attack(piece, piece_pos, target_pos, board):
-    row, col = piece_pos
-    target_row, target_col = target_pos
-
-    if piece.type == "pawn":
-        direction = -1 if piece.color == "white" else 1
-        if (target_row == row + direction and target_col in [col - 1, col + 1]):
-            return True
-    elif piece.type == "rook":
-        if row == target_row or col == target_col:
-            return True
-    elif piece.type == "knight":
-        if (abs(row - target_row), abs(col - target_col)) in [(2, 1), (1, 2)]:
-            return True
-    elif piece.type == "bishop":
-        if abs(row - target_row) == abs(col - target_col):
-            return True
-    elif piece.type == "queen":
-        if row == target_row or col == target_col or abs(row - target_row) == abs(col - target_col):
-            return True
-    elif piece.type == "king":
-        if max(abs(row - target_row), abs(col - target_col)) == 1:
-            return True
-
-    return False
-
-# Get valid moves for a piece
-def get_valid_moves(piece, row, col, board):
-    """Return a list of valid moves for the given piece."""
-    moves = []
-
-    if piece.type == "pawn":
-        direction = -1 if piece.color == "white" else 1
-        if 0 <= row + direction < 8 and board[row + direction][col] is None:
-            moves.append((row + direction, col))
-            if not piece.has_moved and board[row + 2 * direction][col] is None:
-                moves.append((row + 2 * direction, col))
-
-        for dc in [-1, 1]:
-            if 0 <= row + direction < 8 and 0 <= col + dc < 8:
-                target = board[row + direction][col + dc]
-                if target and target.color != piece.color:
-                    moves.append((row + direction, col + dc))
-    elif piece.type == 'rook':
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            while 0 <= r < 8 and 0 <= c < 8:
-                if board[r][c]:
-                    if board[r][c].color != piece.color:
-                        moves.append((r, c))
-                    break
-                moves.append((r, c))
-                r += dr
-                c += dc
-    elif piece.type == 'knight':
-        knight_moves = [(-2, -1), (-1, -2), (1, -2), (2, -1), (2, 1), (1, 2), (-1, 2), (-2, 1)]
-        for dr, dc in knight_moves:
-            r, c = row + dr, col + dc
-            if 0 <= r < 8 and 0 <= c < 8:
-                if not board[r][c] or board[r][c].color != piece.color:
-                    moves.append((r, c))
-    elif piece.type == 'bishop':
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            while 0 <= r < 8 and 0 <= c < 8:
-                if board[r][c]:
-                    if board[r][c].color != piece.color:
-                        moves.append((r, c))
-                    break
-                moves.append((r, c))
-                r += dr
-                c += dc
-    elif piece.type == 'queen':
-        directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-        for dr, dc in directions:
-            r, c = row + dr, col + dc
-            while 0 <= r < 8 and 0 <= c < 8:
-                if board[r][c]:
-                    if board[r][c].color != piece.color:
-                        moves.append((r, c))
-                    break
-                moves.append((r, c))
-                r += dr
-                c += dc
-    elif piece.type == 'king':
-        king_moves = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
-        for dr, dc in king_moves:
-            r, c = row + dr, col + dc
-            if 0 <= r < 8 and 0 <= c < 8:
-                if not board[r][c] or board[r][c].color != piece.color:
-                    moves.append((r, c))
-
-    # Filter out moves that would leave the king in check
-    valid_moves = []
-    for move in moves:
-        original_piece = board[move[0]][move[1]]
-        board[move[0]][move[1]] = piece
-        board[row][col] = None
-        if not is_king_in_check(board, piece.color):
-            valid_moves.append(move)
-        board[row][col] = piece
-        board[move[0]][move[1]] = original_piece
-
-    return valid_moves
-
-# Check if the current player is in checkmate
-def is_checkmate(board, player_color):
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece.color == player_color:
-                if get_valid_moves(piece, row, col, board):
-                    return False
-    return True
+# Select a piece of the side to move and look up its legal destinations
+def select_piece(piece, row, col):
+    global selected_piece, selected_pos, selected_moves
+    selected_pos = (row, col)
+    selected_piece = piece
+    selected_moves = legal_moves(board, current_player).get((row, col), [])
 
 # Handle piece click (movement)
 def handle_click(pos):
-    global selected_piece, selected_pos, current_player, last_move_start, last_move_end
+    global selected_piece, selected_pos, selected_moves, current_player, last_move_start, last_move_end
 
     col, row = pos[0] // SQUARE_SIZE, pos[1] // SQUARE_SIZE
     piece = board[row][col]
 
     if selected_piece:
         if piece and piece.color == selected_piece.color:
-            selected_pos = (row, col)
-            selected_piece = piece
+            select_piece(piece, row, col)
             return
-        if (row, col) in get_valid_moves(selected_piece, selected_pos[0], selected_pos[1], board):
+        if (row, col) in selected_moves:
             last_move_start = selected_pos
             last_move_end = (row, col)
             board[row][col] = selected_piece
             board[selected_pos[0]][selected_pos[1]] = None
             selected_piece.has_moved = True
+            promotion = 0
             if selected_piece.type == "pawn" and (row == 0 or row == 7):
                 board[row][col] = ChessPiece(selected_piece.color, "queen", PIECE_IMAGES[f"{selected_piece.color}_queen"])
+                promotion = PROMOTES_TO_QUEEN
+            game_moves.append((selected_pos, (row, col), promotion))
+            clear_move_cache()
+            current_player = "black" if current_player == "white" else "white"
             if is_king_in_check(board, current_player):
                 if is_checkmate(board, current_player):
                     print(f"{current_player.capitalize()} is in checkmate. Game over!")
-                    pygame.quit()
-                    sys.exit()
-            current_player = "black" if current_player == "white" else "white"
+                    end_game(RESULT_WHITE_WINS if current_player == "black" else RESULT_BLACK_WINS)
             if current_player == "black":
                 computer_move()
         else:
             print("Invalid move!")
         selected_piece = None
         selected_pos = None
+        selected_moves = []
     else:
         if piece and piece.color == current_player:
-            selected_pos = (row, col)
-            selected_piece = piece
+            select_piece(piece, row, col)
 
 # Computer move logic
 def computer_move():
-    global current_player, last_move_start, last_move_end
-    valid_moves = []
+    with profiler.timer("computer_move"):
+        _computer_move()
 
-    for row in range(8):
-        for col in range(8):
-            piece = board[row][col]
-            if piece and piece.color == "black":
-                moves = get_valid_moves(piece, row, col, board)
-                for move in moves:
-                    valid_moves.append((piece, (row, col), move))
-
-    if valid_moves:
-        # Prioritize capturing moves
-        capture_moves = [(piece, start_pos, end_pos) for piece, start_pos, end_pos in valid_moves if board[end_pos[0]][end_pos[1]]]
-        if capture_moves:
-            piece, start_pos, end_pos = random.choice(capture_moves)
-        else:
-            piece, start_pos, end_pos = random.choice(valid_moves)
-        
+def _computer_move():
+    global current_player, last_move_start, last_move_end
+    move = None
+    if position_cache is not None:
+        key = position_hash(board, "black")
+        cached = position_cache.get(key, POSITION_CACHE_MIN_DEPTH)
+        if cached and cached[2][1] in legal_moves(board, "black").get(cached[2][0], ()):
+            move = cached[2]
+    if move is None:
+        move, score, depth_reached = engine.search(board, "black", ENGINE_MAX_DEPTH, ENGINE_MOVE_TIME)
+        if position_cache is not None and move and depth_reached:
+            position_cache.put(key, depth_reached, score, move)
+
+    if move:
+        start_pos, end_pos = move
+        piece = board[start_pos[0]][start_pos[1]]
         last_move_start = start_pos
         last_move_end = end_pos
         board[end_pos[0]][end_pos[1]] = piece
         board[start_pos[0]][start_pos[1]] = None
         piece.has_moved = True
+        promotion = 0
         if piece.type == "pawn" and (end_pos[0] == 0 or end_pos[0] == 7):
             board[end_pos[0]][end_pos[1]] = ChessPiece(piece.color, "queen", PIECE_IMAGES[f"{piece.color}_queen"])
+            promotion = PROMOTES_TO_QUEEN
+        game_moves.append((start_pos, end_pos, promotion))
+        clear_move_cache()
 
     if is_king_in_check(board, "white"):
         if is_checkmate(board, "white"):
             print("White is in checkmate. Game over!")
-            pygame.quit()
-            sys.exit()
+            end_game(RESULT_BLACK_WINS)
 
     current_player = "white"
 
+# Record the finished game in the archive (unless no move was played) and close the window
+def end_game(result):
+    if game_moves:
+        with ArchiveWriter(ARCHIVE_PATH) as archive:
+            game_id = archive.append(game_moves, result, black_seed=game_seed)
+        print(f"Game {game_id} saved to {ARCHIVE_PATH}")
+    if position_cache is not None:
+        position_cache.close()
+    if profiler.enabled:
+        save_profile()
+    pygame.quit()
+    sys.exit()
+
+# Write the collected profile next to the game
+def save_profile():
+    profiler.export_json(PROFILE_JSON)
+    profiler.dump_stats(PROFILE_STATS)
+    print(f"Profile written to {PROFILE_JSON} and {PROFILE_STATS}")
+
 # Main game loop
 def main():
+    global game_seed
+    # CHESS_SEED fixes the seed of the computer's random tie-breaks
+    game_seed = int(os.environ.get("CHESS_SEED") or random.SystemRandom().getrandbits(63))
+    random.seed(game_seed)
+    engine.rng.seed(game_seed)
+    if os.environ.get("CHESS_PROFILE"):
+        profiler.enable(cprofile=os.environ["CHESS_PROFILE"] == "cprofile")
     init_board()
     while True:
+        frame_start = time.perf_counter()
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                end_game(RESULT_UNKNOWN)
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 handle_click(pygame.mouse.get_pos())
-        draw_board()
-        draw_pieces()
-        pygame.display.flip()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                if not profiler.toggle():
+                    save_profile()
+        with profiler.timer("draw_board"):
+            draw_board()
+        with profiler.timer("draw_pieces"):
+            draw_pieces()
+        with profiler.timer("display_flip"):
+            pygame.display.flip()
+        if profiler.enabled:
+            profiler.record_frame(time.perf_counter() - frame_start)
 
         if current_player == "black":
             computer_move()
@@ -0,0 +1,133 @@
+import json
+import os
+import zlib
+
+from movegen import PIECE_TYPES
+
+# Tuned parameters written by texel_tuner.py replace the defaults below when present
+EVAL_PARAMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_params.json")
+
+# Default piece values in centipawns
+DEFAULT_PIECE_VALUES = {"pawn": 100, "knight": 320, "bishop": 330, "rook": 500, "queen": 900, "king": 0}
+
+# Default piece-square tables from white's point of view, indexed [row][col] with row 0 the far rank
+DEFAULT_PST = {
+    "pawn": [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [50, 50, 50, 50, 50, 50, 50, 50],
+        [10, 10, 20, 30, 30, 20, 10, 10],
+        [5, 5, 10, 25, 25, 10, 5, 5],
+        [0, 0, 0, 20, 20, 0, 0, 0],
+        [5, -5, -10, 0, 0, -10, -5, 5],
+        [5, 10, 10, -20, -20, 10, 10, 5],
+        [0, 0, 0, 0, 0, 0, 0, 0],
+    ],
+    "knight": [
+        [-50, -40, -30, -30, -30, -30, -40, -50],
+        [-40, -20, 0, 0, 0, 0, -20, -40],
+        [-30, 0, 10, 15, 15, 10, 0, -30],
+        [-30, 5, 15, 20, 20, 15, 5, -30],
+        [-30, 0, 15, 20, 20, 15, 0, -30],
+        [-30, 5, 10, 15, 15, 10, 5, -30],
+        [-40, -20, 0, 5, 5, 0, -20, -40],
+        [-50, -40, -30, -30, -30, -30, -40, -50],
+    ],
+    "bishop": [
+        [-20, -10, -10, -10, -10, -10, -10, -20],
+        [-10, 0, 0, 0, 0, 0, 0, -10],
+        [-10, 0, 5, 10, 10, 5, 0, -10],
+        [-10, 5, 5, 10, 10, 5, 5, -10],
+        [-10, 0, 10, 10, 10, 10, 0, -10],
+        [-10, 10, 10, 10, 10, 10, 10, -10],
+        [-10, 5, 0, 0, 0, 0, 5, -10],
+        [-20, -10, -10, -10, -10, -10, -10, -20],
+    ],
+    "rook": [
+        [0, 0, 0, 0, 0, 0, 0, 0],
+        [5, 10, 10, 10, 10, 10, 10, 5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [-5, 0, 0, 0, 0, 0, 0, -5],
+        [0, 0, 0, 5, 5, 0, 0, 0],
+    ],
+    "queen": [
+        [-20, -10, -10, -5, -5, -10, -10, -20],
+        [-10, 0, 0, 0, 0, 0, 0, -10],
+        [-10, 0, 5, 5, 5, 5, 0, -10],
+        [-5, 0, 5, 5, 5, 5, 0, -5],
+        [0, 0, 5, 5, 5, 5, 0, -5],
+        [-10, 5, 5, 5, 5, 5, 0, -10],
+        [-10, 0, 5, 0, 0, 0, 0, -10],
+        [-20, -10, -10, -5, -5, -10, -10, -20],
+    ],
+    "king": [
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-30, -40, -40, -50, -50, -40, -40, -30],
+        [-20, -30, -30, -40, -40, -30, -30, -20],
+        [-10, -20, -20, -20, -20, -20, -20, -10],
+        [20, 20, 0, 0, 0, 0, 20, 20],
+        [20, 30, 10, 0, 0, 10, 30, 20],
+    ],
+}
+
+# Active parameters: value plus square bonus per (color, type), indexed [row][col]
+PIECE_VALUES = dict(DEFAULT_PIECE_VALUES)
+PST = {piece_type: [list(row) for row in table] for piece_type, table in DEFAULT_PST.items()}
+SQUARE_SCORES = {}
+
+
+def _build_square_scores():
+    for piece_type in PIECE_TYPES:
+        value, table = PIECE_VALUES[piece_type], PST[piece_type]
+        SQUARE_SCORES[("white", piece_type)] = [[value + table[row][col] for col in range(8)] for row in range(8)]
+        SQUARE_SCORES[("black", piece_type)] = [[-(value + table[7 - row][col]) for col in range(8)] for row in range(8)]
+
+
+# Install evaluation parameters from a JSON file written by the tuner
+def load_params(path=EVAL_PARAMS_PATH):
+    with open(path) as f:
+        params = json.load(f)
+    PIECE_VALUES.update(params.get("piece_values", {}))
+    for piece_type, table in params.get("pst", {}).items():
+        PST[piece_type] = [list(row) for row in table]
+    _build_square_scores()
+
+
+# Go back to the built-in parameters, whatever was loaded at import
+def reset_params():
+    PIECE_VALUES.clear()
+    PIECE_VALUES.update(DEFAULT_PIECE_VALUES)
+    for piece_type, table in DEFAULT_PST.items():
+        PST[piece_type] = [list(row) for row in table]
+    _build_square_scores()
+
+
+# Short fingerprint of the active parameters, to tell tuned and built-in evaluations apart
+def params_checksum():
+    data = json.dumps({"piece_values": PIECE_VALUES, "pst": PST}, sort_keys=True)
+    return f"{zlib.crc32(data.encode()):08x}"
+
+
+def save_params(path, piece_values, pst):
+    with open(path, "w") as f:
+        json.dump({"piece_values": piece_values, "pst": pst}, f, indent=1)
+
+
+# Static evaluation in centipawns, positive when white is better
+def evaluate(board):
+    score = 0
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece:
+                score += SQUARE_SCORES[(piece.color, piece.type)][row][col]
+    return score
+
+
+_build_square_scores()
+if os.path.exists(EVAL_PARAMS_PATH):
+    load_params()
@@ -0,0 +1,197 @@
+import mmap
+import os
+import struct
+
+from movegen import new_board, opponent, play_move
+
+# Bumped whenever move generation or search changes the games the engine plays:
+# 1 random captures, 2 greedy static evaluation, 3 time-limited PVS search
+ENGINE_VERSION = 3
+
+# Game results stored in the header
+RESULT_UNKNOWN, RESULT_WHITE_WINS, RESULT_BLACK_WINS, RESULT_DRAW = range(4)
+
+FILE_MAGIC = b"CHGA"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHH")  # magic, format version, reserved
+
+# Per game: result, reserved, engine version, white seed, black seed, move count
+GAME_HEADER = struct.Struct("<BBHQQI")
+
+# Side index entry per game: byte offset of its header, id of its first position
+INDEX_ENTRY = struct.Struct("<QQ")
+
+# A move is 16 bits: from square (6), to square (6), promotion flag (4); square = row * 8 + col
+PROMOTES_TO_QUEEN = 1
+
+
+def encode_move(start, end, promotion=0):
+    return (start[0] * 8 + start[1]) | ((end[0] * 8 + end[1]) << 6) | (promotion << 12)
+
+
+def decode_move(code):
+    start, end = code & 63, (code >> 6) & 63
+    return (start >> 3, start & 7), (end >> 3, end & 7), code >> 12
+
+
+def index_path(path):
+    return path + ".idx"
+
+
+# Append-only writer
+class ArchiveWriter:
+    """Append games to ``path`` and their offsets to ``path + ".idx"``."""
+
+    def __init__(self, path):
+        self.path = path
+        self.data = open(path, "ab")
+        if self.data.tell() == 0:
+            self.data.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, 0))
+        self.index = open(index_path(path), "ab")
+        entries = self.index.tell() // INDEX_ENTRY.size
+        self.game_count = entries
+        self.position_count = 0
+        if entries:
+            # Recover the running position count from the last indexed game
+            with open(path, "rb") as f, open(index_path(path), "rb") as idx:
+                idx.seek((entries - 1) * INDEX_ENTRY.size)
+                offset, first_position = INDEX_ENTRY.unpack(idx.read(INDEX_ENTRY.size))
+                f.seek(offset)
+                move_count = GAME_HEADER.unpack(f.read(GAME_HEADER.size))[-1]
+                self.position_count = first_position + move_count + 1
+
+    def append(self, moves, result=RESULT_UNKNOWN, white_seed=0, black_seed=0, engine_version=ENGINE_VERSION):
+        """Store a game given as a list of (start, end) or (start, end, promotion) moves; return its id."""
+        codes = [encode_move(*move) for move in moves]
+        offset = self.data.tell()
+        self.data.write(GAME_HEADER.pack(result, 0, engine_version, white_seed, black_seed, len(codes)))
+        self.data.write(struct.pack(f"<{len(codes)}H", *codes))
+        self.data.flush()
+        # The index entry goes last, so readers never see a half-written game
+        self.index.write(INDEX_ENTRY.pack(offset, self.position_count))
+        self.index.flush()
+        game_id = self.game_count
+        self.game_count += 1
+        self.position_count += len(codes) + 1
+        return game_id
+
+    def close(self):
+        self.data.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class GameRecord:
+    def __init__(self, game_id, result, engine_version, white_seed, black_seed, moves):
+        self.game_id = game_id
+        self.result = result
+        self.engine_version = engine_version
+        self.white_seed = white_seed
+        self.black_seed = black_seed
+        self.moves = moves  # [(start, end, promotion)]
+
+
+# Random-access reader over memory-mapped archive files
+class ArchiveReader:
+    """Read games and positions by id without parsing the whole archive.
+
+    Only games indexed when the reader was opened are visible.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._data_file = open(path, "rb")
+        self.data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _ = FILE_HEADER.unpack_from(self.data, 0)
+        if magic != FILE_MAGIC or version != FILE_VERSION:
+            raise ValueError(f"{path} is not a version {FILE_VERSION} game archive")
+        self._index_file = open(index_path(path), "rb")
+        size = os.fstat(self._index_file.fileno()).st_size
+        self.game_count = size // INDEX_ENTRY.size
+        self.index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return self.game_count
+
+    def _entry(self, game_id):
+        if not 0 <= game_id < self.game_count:
+            raise IndexError(f"game {game_id} not in archive")
+        return INDEX_ENTRY.unpack_from(self.index, game_id * INDEX_ENTRY.size)
+
+    def game(self, game_id):
+        offset, _ = self._entry(game_id)
+        result, _, engine_version, white_seed, black_seed, move_count = GAME_HEADER.unpack_from(self.data, offset)
+        codes = struct.unpack_from(f"<{move_count}H", self.data, offset + GAME_HEADER.size)
+        return GameRecord(game_id, result, engine_version, white_seed, black_seed, [decode_move(c) for c in codes])
+
+    @property
+    def position_count(self):
+        if not self.game_count:
+            return 0
+        offset, first_position = self._entry(self.game_count - 1)
+        return first_position + GAME_HEADER.unpack_from(self.data, offset)[-1] + 1
+
+    def position(self, position_id):
+        """Return (board, player to move, game id, ply) for a global position id."""
+        lo, hi = 0, self.game_count - 1
+        if hi < 0 or position_id < 0:
+            raise IndexError(f"position {position_id} not in archive")
+        # Binary search for the last game whose first position is <= position_id
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._entry(mid)[1] <= position_id:
+                lo = mid
+            else:
+                hi = mid - 1
+        record = self.game(lo)
+        ply = position_id - self._entry(lo)[1]
+        if ply > len(record.moves):
+            raise IndexError(f"position {position_id} not in archive")
+        board, player = replay(record.moves[:ply])
+        return board, player, lo, ply
+
+    def iter_games(self):
+        for game_id in range(self.game_count):
+            yield self.game(game_id)
+
+    def iter_positions(self):
+        """Yield (game record, ply, board, player to move) for every stored position.
+
+        The board is updated in place between positions; copy it to keep it.
+        """
+        for record in self.iter_games():
+            board, player = new_board(), "white"
+            yield record, 0, board, player
+            for ply, (start, end, _) in enumerate(record.moves, 1):
+                play_move(board, start, end)
+                player = opponent(player)
+                yield record, ply, board, player
+
+    def close(self):
+        if self.game_count:
+            self.index.close()
+        self.data.close()
+        self._index_file.close()
+        self._data_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# Rebuild the position reached after a sequence of moves from the start
+def replay(moves):
+    board, player = new_board(), "white"
+    for start, end, _ in moves:
+        play_move(board, start, end)
+        player = opponent(player)
+    return board, player
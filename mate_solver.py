@@ -0,0 +1,294 @@
+"""Prove forced mates with depth-first proof-number search (df-pn).
+
+The side to move attacks and may only play checking moves; the defender
+tries every legal reply. Proof and disproof numbers steer the search
+towards the most promising line, which finds deep forced mates with far
+fewer nodes than full-width alpha-beta. Mate lengths are tried from 1 up,
+so the mate reported is the shortest one.
+
+    python mate_solver.py "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"
+    python mate_solver.py --puzzles puzzles.txt --max-moves 7 --workers 8
+"""
+import argparse
+import heapq
+import multiprocessing
+import os
+import time
+
+from movegen import clear_move_cache, is_king_in_check, make_move, opponent, position_hash, unmake_move
+from notation import board_from_fen, move_to_san
+from search import generate_moves
+
+INFINITY = 10 ** 9
+
+# Rough memory cost of one transposition table entry (key tuple, value tuple and dict slot)
+TT_ENTRY_BYTES = 250
+
+# Smallest table accepted; below it longer mates spend most of their nodes re-searching evicted positions
+MIN_TT_MB = 1
+
+
+class NodeLimitReached(Exception):
+    pass
+
+
+class MateResult:
+    def __init__(self, mate_in, line, nodes, seconds):
+        self.mate_in = mate_in  # Moves to mate, or None if none was proven
+        self.line = line  # SAN of one proof line
+        self.nodes = nodes
+        self.seconds = seconds
+
+
+# Proof-number search for mates by the side to move
+class MateSolver:
+    """df-pn mate prover with a transposition table of about ``tt_mb`` megabytes.
+
+    Table keys are (position hash, attacker moves left), so the same
+    position proven with fewer moves left is never reused for a longer
+    bound by mistake. When the table is full the entries that took the
+    fewest nodes to compute are dropped, never the children of a node
+    that is still being searched: losing those would make _mid expand
+    them again and again without progress.
+    """
+
+    def __init__(self, tt_mb=64, node_limit=None):
+        self.tt = {}  # (hash, moves left) -> (proof number, disproof number, nodes spent on it)
+        self.pinned = {}  # Keys of the children of nodes on the search path -> number of pins
+        if tt_mb < MIN_TT_MB:
+            raise ValueError(f"transposition table must be at least {MIN_TT_MB} MB")
+        self.max_entries = tt_mb * 1024 * 1024 // TT_ENTRY_BYTES
+        self.node_limit = node_limit
+        self.nodes = 0
+
+    def _lookup(self, key):
+        entry = self.tt.get(key)
+        return (entry[0], entry[1]) if entry else (1, 1)
+
+    def _work(self, key):
+        entry = self.tt.get(key)
+        return entry[2] if entry else 0
+
+    def _store(self, key, pn, dn, work=1):
+        if key not in self.tt and len(self.tt) >= self.max_entries:
+            self._evict()
+        self.tt[key] = (pn, dn, work)
+
+    def _evict(self):
+        # Drop the cheapest quarter of the unpinned entries; one pass per max_entries / 4 new entries
+        candidates = [(entry[2], key) for key, entry in self.tt.items() if key not in self.pinned]
+        for _, key in heapq.nsmallest(max(1, len(self.tt) // 4), candidates):
+            del self.tt[key]
+
+    def _pin(self, children):
+        for _, key in children:
+            self.pinned[key] = self.pinned.get(key, 0) + 1
+
+    def _unpin(self, children):
+        for _, key in children:
+            count = self.pinned[key] - 1
+            if count:
+                self.pinned[key] = count
+            else:
+                del self.pinned[key]
+
+    def _children(self, board, player, moves_left, attacking):
+        """Return [(move, child key)]: checking moves for the attacker, every legal move for the defender."""
+        child_moves_left = moves_left - 1 if attacking else moves_left
+        children = []
+        for start, end in generate_moves(board, player):
+            undo = make_move(board, start, end)
+            if not attacking or is_king_in_check(board, opponent(player)):
+                children.append(((start, end), (position_hash(board, opponent(player)), child_moves_left)))
+            unmake_move(board, undo)
+        return children
+
+    def _mid(self, board, player, key, moves_left, attacking, threshold_pn, threshold_dn):
+        started = self.nodes
+        self.nodes += 1
+        if self.node_limit and self.nodes > self.node_limit:
+            raise NodeLimitReached
+        if attacking and moves_left == 0:
+            self._store(key, INFINITY, 0)
+            return
+        children = self._children(board, player, moves_left, attacking)
+        if not children:
+            if not attacking and is_king_in_check(board, player):
+                self._store(key, 0, INFINITY)  # Checkmate
+            else:
+                self._store(key, INFINITY, 0)  # No checks left, or stalemate
+            return
+
+        # Proof and disproof numbers of the children live only in the table, so they must stay there
+        self._pin(children)
+        try:
+            while True:
+                # OR node (attacker): one proven child proves it; AND node (defender): all must be proven
+                numbers = [self._lookup(child_key) for _, child_key in children]
+                if attacking:
+                    pn, dn = min(n[0] for n in numbers), min(INFINITY, sum(n[1] for n in numbers))
+                    ranked = sorted(range(len(children)), key=lambda i: numbers[i][0])
+                else:
+                    pn, dn = min(INFINITY, sum(n[0] for n in numbers)), min(n[1] for n in numbers)
+                    ranked = sorted(range(len(children)), key=lambda i: numbers[i][1])
+                if pn >= threshold_pn or dn >= threshold_dn:
+                    break
+                best = ranked[0]
+                best_pn, best_dn = numbers[best]
+                if attacking:
+                    second = numbers[ranked[1]][0] if len(ranked) > 1 else INFINITY
+                    child_pn = min(threshold_pn, second + 1)
+                    child_dn = min(INFINITY, threshold_dn - dn + best_dn)
+                else:
+                    second = numbers[ranked[1]][1] if len(ranked) > 1 else INFINITY
+                    child_dn = min(threshold_dn, second + 1)
+                    child_pn = min(INFINITY, threshold_pn - pn + best_pn)
+                (start, end), child_key = children[best]
+                undo = make_move(board, start, end)
+                try:
+                    child_moves_left = moves_left - 1 if attacking else moves_left
+                    self._mid(board, opponent(player), child_key, child_moves_left, not attacking, child_pn, child_dn)
+                finally:
+                    unmake_move(board, undo)
+        finally:
+            self._unpin(children)
+        self._store(key, pn, dn, self._work(key) + self.nodes - started)
+
+    def prove(self, board, player, moves):
+        """Return True if the side to move mates within ``moves`` moves."""
+        key = (position_hash(board, player), moves)
+        self._mid(board, player, key, moves, True, INFINITY, INFINITY)
+        return self._lookup(key)[0] == 0
+
+    def _proven(self, board, player, key, moves_left, attacking):
+        """Return True if the node is proven, searching it when the table has no verdict (e.g. after eviction)."""
+        pn, dn = self._lookup(key)
+        if pn and dn:
+            self._mid(board, player, key, moves_left, attacking, INFINITY, INFINITY)
+            pn = self._lookup(key)[0]
+        return pn == 0
+
+    def _mate_distance(self, board, player, max_moves):
+        """Return the fewest moves the side to move needs to mate, for a position proven within ``max_moves``."""
+        position = position_hash(board, player)
+        for moves in range(1, max_moves):
+            if self._proven(board, player, (position, moves), moves, True):
+                return moves
+        return max_moves
+
+    def proof_line(self, board, player, moves):
+        """Return the main line of a mate prove() found: the quickest mate against the longest defence."""
+        line, undos = [], []
+        moves_left = moves
+        # The mate is already proven, so finishing its line is not held to the node limit
+        node_limit, self.node_limit = self.node_limit, None
+        try:
+            while moves_left:
+                attack = None
+                for move, key in self._children(board, player, moves_left, True):
+                    undo = make_move(board, *move)
+                    proven = self._proven(board, opponent(player), key, moves_left - 1, False)
+                    unmake_move(board, undo)
+                    if proven:
+                        attack = move
+                        break
+                if attack is None:
+                    break
+                line.append((attack, player))
+                undos.append(make_move(board, *attack))
+                player = opponent(player)
+
+                # Every defence is mated within moves_left - 1; follow the one that lasts longest
+                defence, longest = None, -1
+                for move, _ in self._children(board, player, moves_left - 1, False):
+                    undo = make_move(board, *move)
+                    distance = self._mate_distance(board, opponent(player), moves_left - 1)
+                    unmake_move(board, undo)
+                    if distance > longest:
+                        defence, longest = move, distance
+                if defence is None:
+                    break  # Checkmate
+                line.append((defence, player))
+                undos.append(make_move(board, *defence))
+                player = opponent(player)
+                moves_left = longest
+        finally:
+            self.node_limit = node_limit
+            for undo in reversed(undos):
+                unmake_move(board, undo)
+        return line
+
+
+def solve(board, player, max_moves=8, tt_mb=64, node_limit=None):
+    """Find the shortest forced mate for the side to move, up to ``max_moves`` moves."""
+    solver = MateSolver(tt_mb, node_limit)
+    started = time.perf_counter()
+    try:
+        for moves in range(1, max_moves + 1):
+            if solver.prove(board, player, moves):
+                line = _san_line(board, solver.proof_line(board, player, moves))
+                return MateResult(moves, line, solver.nodes, time.perf_counter() - started)
+    except NodeLimitReached:
+        pass
+    finally:
+        clear_move_cache()
+    return MateResult(None, [], solver.nodes, time.perf_counter() - started)
+
+
+def _san_line(board, line):
+    sans, undos = [], []
+    for move, player in line:
+        sans.append(move_to_san(board, player, move))
+        undos.append(make_move(board, *move))
+    for undo in reversed(undos):
+        unmake_move(board, undo)
+    return sans
+
+
+# Puzzle files hold one FEN per line; blank lines and lines starting with # are skipped
+def read_puzzles(path):
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def _solve_fen(task):
+    fen, max_moves, tt_mb, node_limit = task
+    board, player = board_from_fen(fen)
+    result = solve(board, player, max_moves, tt_mb, node_limit)
+    return fen, result.mate_in, result.line, result.nodes, result.seconds
+
+
+def _report(fen, mate_in, line, nodes, seconds):
+    found = f"mate in {mate_in}: {' '.join(line)}" if mate_in else "no mate found"
+    print(f"{fen}\t{found}\t{nodes} nodes\t{seconds:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("fen", nargs="?", help="position to solve")
+    parser.add_argument("--puzzles", help="file with one FEN per line, solved in parallel")
+    parser.add_argument("--max-moves", type=int, default=8, help="longest mate to look for, in moves")
+    parser.add_argument("--tt-mb", type=int, default=64, help="transposition table size per solver (MB)")
+    parser.add_argument("--nodes", type=int, help="give up on a puzzle after this many nodes")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    if not args.fen and not args.puzzles:
+        parser.error("give a FEN or --puzzles")
+    if args.tt_mb < MIN_TT_MB:
+        parser.error(f"--tt-mb must be at least {MIN_TT_MB}")
+
+    if args.fen:
+        _report(*_solve_fen((args.fen, args.max_moves, args.tt_mb, args.nodes)))
+    if args.puzzles:
+        tasks = [(fen, args.max_moves, args.tt_mb, args.nodes) for fen in read_puzzles(args.puzzles)]
+        started = time.perf_counter()
+        solved = 0
+        with multiprocessing.Pool(args.workers) as pool:
+            for result in pool.imap(_solve_fen, tasks):
+                _report(*result)
+                solved += result[1] is not None
+        print(f"{solved}/{len(tasks)} puzzles solved in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+import random
+
+from profiling import profiler
+
+# Precomputed move tables, indexed [row][col] (and by colour for pawns).
+# Every entry holds on-board (row, col) targets, so generating moves is a
+# table walk with no arithmetic or bounds checks.
+
+KNIGHT_OFFSETS = [(-2, -1), (-1, -2), (1, -2), (2, -1), (2, 1), (1, 2), (-1, 2), (-2, 1)]
+KING_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+# Ray directions: the first four are orthogonal (rook), the last four diagonal (bishop)
+DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
+ROOK_DIRECTIONS = (0, 1, 2, 3)
+BISHOP_DIRECTIONS = (4, 5, 6, 7)
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+
+PAWN_DIRECTION = {"white": -1, "black": 1}
+PAWN_START_ROW = {"white": 6, "black": 1}
+
+
+def _on_board(r, c):
+    return 0 <= r < 8 and 0 <= c < 8
+
+
+def _step_table(offsets):
+    return [[tuple((row + dr, col + dc) for dr, dc in offsets if _on_board(row + dr, col + dc))
+             for col in range(8)] for row in range(8)]
+
+
+def _ray(row, col, dr, dc):
+    ray = []
+    r, c = row + dr, col + dc
+    while _on_board(r, c):
+        ray.append((r, c))
+        r += dr
+        c += dc
+    return tuple(ray)
+
+
+def _pawn_tables(color):
+    direction = PAWN_DIRECTION[color]
+    pushes, captures = [], []
+    for row in range(8):
+        push_row, capture_row = [], []
+        for col in range(8):
+            r = row + direction
+            if not _on_board(r, col):
+                push_row.append(())
+                capture_row.append(())
+                continue
+            push = [(r, col)]
+            if row == PAWN_START_ROW[color]:
+                push.append((r + direction, col))
+            push_row.append(tuple(push))
+            capture_row.append(tuple((r, col + dc) for dc in (-1, 1) if _on_board(r, col + dc)))
+        pushes.append(push_row)
+        captures.append(capture_row)
+    return pushes, captures
+
+
+KNIGHT_TARGETS = _step_table(KNIGHT_OFFSETS)
+KING_TARGETS = _step_table(KING_OFFSETS)
+
+# RAYS[row][col][d] is the ordered run of squares from (row, col) towards DIRECTIONS[d]
+RAYS = [[tuple(_ray(row, col, dr, dc) for dr, dc in DIRECTIONS) for col in range(8)] for row in range(8)]
+
+# PAWN_PUSHES[color][row][col] holds the single push followed by the double push from the start row
+PAWN_PUSHES = {}
+PAWN_CAPTURES = {}
+for _color in PAWN_DIRECTION:
+    PAWN_PUSHES[_color], PAWN_CAPTURES[_color] = _pawn_tables(_color)
+
+SLIDER_DIRECTIONS = {"rook": ROOK_DIRECTIONS, "bishop": BISHOP_DIRECTIONS, "queen": QUEEN_DIRECTIONS}
+STEP_TARGETS = {"knight": KNIGHT_TARGETS, "king": KING_TARGETS}
+
+# Slider types that attack along each direction
+RAY_ATTACKERS = [("rook", "queen")] * 4 + [("bishop", "queen")] * 4
+
+# Zobrist keys for position hashing, fixed-seeded so hashes are stable between runs
+PIECE_TYPES = ("pawn", "knight", "bishop", "rook", "queen", "king")
+_zobrist_rng = random.Random(0x5EED)
+ZOBRIST_PIECES = {
+    (color, piece_type): [[_zobrist_rng.getrandbits(64) for _ in range(8)] for _ in range(8)]
+    for color in ("white", "black") for piece_type in PIECE_TYPES
+}
+ZOBRIST_BLACK_TO_MOVE = _zobrist_rng.getrandbits(64)
+
+
+# Lightweight piece for boards that are never drawn with ChessPiece images
+class Piece:
+    def __init__(self, color, type):
+        self.color = color
+        self.type = type
+        self.has_moved = False
+
+
+BACK_RANK = ["rook", "knight", "bishop", "queen", "king", "bishop", "knight", "rook"]
+
+
+# Set up the initial position; make_piece(color, type) builds each piece
+def new_board(make_piece=Piece):
+    board = [[None for _ in range(8)] for _ in range(8)]
+    for col in range(8):
+        board[1][col] = make_piece("black", "pawn")
+        board[6][col] = make_piece("white", "pawn")
+        board[0][col] = make_piece("black", BACK_RANK[col])
+        board[7][col] = make_piece("white", BACK_RANK[col])
+    return board
+
+
+# Play a move on the board, promoting pawns that reach the last row to queens
+def play_move(board, start, end, make_piece=Piece):
+    """Move the piece on ``start`` to ``end`` and return the captured piece, if any."""
+    piece = board[start[0]][start[1]]
+    captured = board[end[0]][end[1]]
+    board[end[0]][end[1]] = piece
+    board[start[0]][start[1]] = None
+    piece.has_moved = True
+    if piece.type == "pawn" and (end[0] == 0 or end[0] == 7):
+        board[end[0]][end[1]] = make_piece(piece.color, "queen")
+    return captured
+
+
+# Make a move for searching; unmake_move(board, undo) restores the board exactly
+def make_move(board, start, end, make_piece=Piece):
+    piece = board[start[0]][start[1]]
+    captured = board[end[0]][end[1]]
+    if piece.type == "pawn" and (end[0] == 0 or end[0] == 7):
+        board[end[0]][end[1]] = make_piece(piece.color, "queen")
+    else:
+        board[end[0]][end[1]] = piece
+    board[start[0]][start[1]] = None
+    return start, end, piece, captured
+
+
+def unmake_move(board, undo):
+    start, end, piece, captured = undo
+    board[start[0]][start[1]] = piece
+    board[end[0]][end[1]] = captured
+
+
+def opponent(color):
+    return "black" if color == "white" else "white"
+
+
+# Get the pseudo-legal moves for a piece, ignoring checks
+def get_pseudo_moves(piece, row, col, board):
+    moves = []
+    if piece.type == "pawn":
+        for r, c in PAWN_PUSHES[piece.color][row][col]:
+            if board[r][c] is not None:
+                break
+            moves.append((r, c))
+        for r, c in PAWN_CAPTURES[piece.color][row][col]:
+            target = board[r][c]
+            if target and target.color != piece.color:
+                moves.append((r, c))
+    elif piece.type in SLIDER_DIRECTIONS:
+        rays = RAYS[row][col]
+        for d in SLIDER_DIRECTIONS[piece.type]:
+            for r, c in rays[d]:
+                target = board[r][c]
+                if target:
+                    if target.color != piece.color:
+                        moves.append((r, c))
+                    break
+                moves.append((r, c))
+    else:
+        for r, c in STEP_TARGETS[piece.type][row][col]:
+            target = board[r][c]
+            if not target or target.color != piece.color:
+                moves.append((r, c))
+    return moves
+
+
+# Get valid moves for a piece
+def get_valid_moves(piece, row, col, board):
+    """Return a list of valid moves for the given piece."""
+    if profiler.enabled:
+        profiler.incr("movegen")
+    moves = get_pseudo_moves(piece, row, col, board)
+    if profiler.enabled:
+        profiler.incr("legality_checks", len(moves))
+
+    # Filter out moves that would leave the king in check
+    valid_moves = []
+    for move in moves:
+        original_piece = board[move[0]][move[1]]
+        board[move[0]][move[1]] = piece
+        board[row][col] = None
+        if not is_king_in_check(board, piece.color):
+            valid_moves.append(move)
+        board[row][col] = piece
+        board[move[0]][move[1]] = original_piece
+
+    return valid_moves
+
+
+# Check if a square is attacked by any piece of the given colour
+def is_square_attacked(board, row, col, by_color):
+    for r, c in KNIGHT_TARGETS[row][col]:
+        piece = board[r][c]
+        if piece and piece.color == by_color and piece.type == "knight":
+            return True
+    for r, c in KING_TARGETS[row][col]:
+        piece = board[r][c]
+        if piece and piece.color == by_color and piece.type == "king":
+            return True
+    # A pawn attacks this square from where an opposing pawn here would capture
+    for r, c in PAWN_CAPTURES[opponent(by_color)][row][col]:
+        piece = board[r][c]
+        if piece and piece.color == by_color and piece.type == "pawn":
+            return True
+    rays = RAYS[row][col]
+    for d in QUEEN_DIRECTIONS:
+        for r, c in rays[d]:
+            piece = board[r][c]
+            if piece:
+                if piece.color == by_color and piece.type in RAY_ATTACKERS[d]:
+                    return True
+                break
+    return False
+
+
+# Check if the king is in check
+def is_king_in_check(board, player_color):
+    if profiler.enabled:
+        profiler.incr("king_in_check")
+    king_pos = find_king(board, player_color)
+    if not king_pos:
+        return True  # King is captured
+    return is_square_attacked(board, king_pos[0], king_pos[1], opponent(player_color))
+
+
+# Get the position of the king for the given player color
+def find_king(board, player_color):
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece and piece.color == player_color and piece.type == "king":
+                return (row, col)
+    return None
+
+
+# Hash a position together with the side to move
+def position_hash(board, player_color):
+    h = ZOBRIST_BLACK_TO_MOVE if player_color == "black" else 0
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece:
+                h ^= ZOBRIST_PIECES[(piece.color, piece.type)][row][col]
+    return h
+
+
+# Legal moves per position hash; cleared whenever a move is played
+_move_cache = {}
+
+
+def clear_move_cache():
+    _move_cache.clear()
+
+
+# Get all legal moves for the side to move, generated once per position
+def legal_moves(board, player_color):
+    """Return {(row, col): [targets]} for every piece of ``player_color`` that can move."""
+    key = position_hash(board, player_color)
+    moves = _move_cache.get(key)
+    if moves is None:
+        moves = {}
+        for row in range(8):
+            for col in range(8):
+                piece = board[row][col]
+                if piece and piece.color == player_color:
+                    targets = get_valid_moves(piece, row, col, board)
+                    if targets:
+                        moves[(row, col)] = targets
+        _move_cache[key] = moves
+    return moves
+
+
+# Check if the current player is in checkmate
+def is_checkmate(board, player_color):
+    return not legal_moves(board, player_color)
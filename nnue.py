@@ -0,0 +1,149 @@
+"""Efficiently updatable neural network (NNUE-style) evaluation in NumPy.
+
+The network has 768 one-hot inputs (colour x piece type x square), one
+hidden layer with a clipped ReLU and a single output in centipawns from
+white's point of view. The hidden-layer pre-activations (the accumulator)
+are kept up to date move by move: a move subtracts and adds at most three
+weight rows instead of recomputing the whole first layer.
+
+Weights are stored quantized as int16 in a small binary file that is
+memory-mapped on load.
+"""
+import struct
+
+import numpy as np
+
+import evaluation
+from movegen import PIECE_TYPES, make_move, unmake_move
+
+INPUT_SIZE = 2 * len(PIECE_TYPES) * 64
+DEFAULT_HIDDEN_SIZE = 128
+
+# Hidden activations are clipped to [0, ACTIVATION_MAX]
+ACTIVATION_MAX = 1024
+
+FILE_MAGIC = b"NNUE"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHHI")  # magic, format version, reserved, hidden size
+
+# Input feature of each piece on each square
+_FEATURE = {}
+for _c, _color in enumerate(("white", "black")):
+    for _t, _piece_type in enumerate(PIECE_TYPES):
+        _FEATURE[(_color, _piece_type)] = [[(_c * len(PIECE_TYPES) + _t) * 64 + row * 8 + col for col in range(8)]
+                                           for row in range(8)]
+
+
+def feature(piece, row, col):
+    return _FEATURE[(piece.color, piece.type)][row][col]
+
+
+def active_features(board):
+    return [feature(piece, row, col) for row in range(8) for col in range(8)
+            if (piece := board[row][col]) is not None]
+
+
+# Quantized weights
+class Network:
+    """int16 weights: input->hidden (``w1``, ``b1``), hidden->output (``w2``) and an int32 output bias."""
+
+    def __init__(self, w1, b1, w2, b2):
+        self.w1 = w1
+        self.b1 = b1
+        self.w2 = w2.astype(np.int64)
+        self.b2 = int(b2)
+        self.hidden_size = len(b1)
+
+    def refresh(self, board):
+        """Compute the accumulator for a board from scratch."""
+        features = active_features(board)
+        return (self.b1 + self.w1[features].sum(axis=0, dtype=np.int16)).astype(np.int16)
+
+    def output(self, accumulator):
+        hidden = np.clip(accumulator, 0, ACTIVATION_MAX)
+        return self.b2 + int(np.dot(hidden, self.w2))
+
+    def evaluate(self, board):
+        return self.output(self.refresh(board))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, 0, self.hidden_size))
+            f.write(np.ascontiguousarray(self.w1, dtype="<i2").tobytes())
+            f.write(np.ascontiguousarray(self.b1, dtype="<i2").tobytes())
+            f.write(np.ascontiguousarray(self.w2, dtype="<i2").tobytes())
+            f.write(struct.pack("<i", self.b2))
+
+
+def load_network(path):
+    """Memory-map a network file written by Network.save."""
+    with open(path, "rb") as f:
+        magic, version, _, hidden = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+    if magic != FILE_MAGIC or version != FILE_VERSION:
+        raise ValueError(f"{path} is not a version {FILE_VERSION} network file")
+    offset = FILE_HEADER.size
+    w1 = np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(INPUT_SIZE, hidden))
+    offset += w1.nbytes
+    b1 = np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(hidden,))
+    offset += b1.nbytes
+    w2 = np.memmap(path, dtype="<i2", mode="r", offset=offset, shape=(hidden,))
+    offset += w2.nbytes
+    b2 = int(np.memmap(path, dtype="<i4", mode="r", offset=offset, shape=(1,))[0])
+    return Network(w1, b1, w2, b2)
+
+
+# Bootstrap network that reproduces the classic evaluation
+def network_from_classic(hidden_size=DEFAULT_HIDDEN_SIZE, noise=0, seed=0):
+    """Encode evaluation.py's piece values and tables in the first two hidden units.
+
+    Unit 0 holds half the score offset by ACTIVATION_MAX / 2 and unit 1 its
+    mirror, so the output equals the classic score (in steps of 4 cp) while
+    it stays within +-2048. The remaining units start with ``noise``-sized
+    random weights and no output connection, ready for training.
+    """
+    rng = np.random.default_rng(seed)
+    w1 = np.zeros((INPUT_SIZE, hidden_size), dtype=np.int16)
+    if noise:
+        w1[:, 2:] = rng.integers(-noise, noise + 1, size=(INPUT_SIZE, hidden_size - 2))
+    for (color, piece_type), squares in _FEATURE.items():
+        scores = evaluation.SQUARE_SCORES[(color, piece_type)]
+        for row in range(8):
+            for col in range(8):
+                quarter = int(round(scores[row][col] / 4))
+                w1[squares[row][col], 0] = quarter
+                w1[squares[row][col], 1] = -quarter
+    b1 = np.zeros(hidden_size, dtype=np.int16)
+    b1[:2] = ACTIVATION_MAX // 2
+    w2 = np.zeros(hidden_size, dtype=np.int16)
+    w2[0], w2[1] = 2, -2
+    return Network(w1, b1, w2, 0)
+
+
+# Search-side evaluator keeping one accumulator per ply
+class NNUEEvaluator:
+    """Evaluator for search.Search whose accumulator follows make/unmake incrementally."""
+
+    def __init__(self, network):
+        self.network = network
+        self.w1 = network.w1
+        self.stack = []
+
+    def reset(self, board):
+        self.stack = [self.network.refresh(board)]
+
+    def make(self, board, start, end):
+        undo = make_move(board, start, end)
+        _, _, piece, captured = undo
+        moved = board[end[0]][end[1]]  # Differs from piece after a promotion
+        accumulator = self.stack[-1] - self.w1[feature(piece, *start)] + self.w1[feature(moved, *end)]
+        if captured:
+            accumulator -= self.w1[feature(captured, *end)]
+        self.stack.append(accumulator)
+        return undo
+
+    def unmake(self, board, undo):
+        unmake_move(board, undo)
+        self.stack.pop()
+
+    def evaluate(self, board):
+        return self.network.output(self.stack[-1])
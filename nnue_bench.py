@@ -0,0 +1,134 @@
+"""Compare the NNUE evaluator with the classic evaluator.
+
+Measures evaluations per second (full and incremental) on positions from
+seeded random games, then plays a match at equal time per move.
+
+    python nnue_bench.py --network net.nnue --games 10 --move-time 0.5
+"""
+import argparse
+import random
+import time
+
+from movegen import is_king_in_check, new_board, opponent, play_move
+from nnue import NNUEEvaluator, load_network, network_from_classic
+from search import ClassicEvaluator, Search, generate_moves
+
+MAX_GAME_PLIES = 160
+
+
+# Positions reached by seeded random play, for speed measurements
+def sample_positions(count, seed=1):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board, player = new_board(), "white"
+        for _ in range(rng.randrange(4, 40)):
+            moves = generate_moves(board, player)
+            if not moves:
+                break
+            play_move(board, *rng.choice(moves))
+            player = opponent(player)
+        positions.append((board, player))
+    return positions
+
+
+def _rate(count, seconds):
+    return count / seconds if seconds > 0 else float("inf")
+
+
+def measure_speed(network, positions, repeat=20):
+    """Return evaluations per second for classic, NNUE from scratch and NNUE incremental."""
+    classic = ClassicEvaluator()
+    evaluations = len(positions) * repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board, _ in positions:
+            classic.evaluate(board)
+    classic_rate = _rate(evaluations, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board, _ in positions:
+            network.evaluate(board)
+    full_rate = _rate(evaluations, time.perf_counter() - start)
+
+    # Incremental: make a move, evaluate, unmake, as the search does at every node
+    evaluator = NNUEEvaluator(network)
+    work = []
+    for board, player in positions:
+        moves = generate_moves(board, player)
+        if moves:
+            work.append((board, moves[0]))
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board, (move_start, move_end) in work:
+            evaluator.reset(board)
+            undo = evaluator.make(board, move_start, move_end)
+            evaluator.evaluate(board)
+            evaluator.unmake(board, undo)
+    elapsed = time.perf_counter() - start
+    # Time the resets separately so only make/evaluate/unmake is counted
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board, _ in work:
+            evaluator.reset(board)
+    elapsed -= time.perf_counter() - start
+    incremental_rate = _rate(len(work) * repeat, elapsed)
+    return classic_rate, full_rate, incremental_rate
+
+
+def play_game(white, black, move_time):
+    """Play one game between two Search instances; return 1, 0.5 or 0 from white's point of view."""
+    board, player = new_board(), "white"
+    engines = {"white": white, "black": black}
+    for _ in range(MAX_GAME_PLIES):
+        move, _, _ = engines[player].search(board, player, depth=64, time_limit=move_time)
+        if move is None:
+            if is_king_in_check(board, player):
+                return 0.0 if player == "white" else 1.0
+            return 0.5
+        play_move(board, *move)
+        player = opponent(player)
+    return 0.5
+
+
+def play_match(network, games, move_time, seed=0):
+    """Return the NNUE engine's score (wins + draws / 2) over ``games`` games, alternating colours."""
+    score = 0.0
+    for game in range(games):
+        rng = random.Random(seed + game)
+        nnue_engine = Search(NNUEEvaluator(network), rng)
+        classic_engine = Search(ClassicEvaluator(), rng)
+        if game % 2 == 0:
+            result = play_game(nnue_engine, classic_engine, move_time)
+        else:
+            result = 1.0 - play_game(classic_engine, nnue_engine, move_time)
+        score += result
+        print(f"game {game + 1}: NNUE {'won' if result == 1 else 'lost' if result == 0 else 'drew'} "
+              f"({score}/{game + 1})")
+    return score
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--network", help="network file; a network bootstrapped from the classic evaluation by default")
+    parser.add_argument("--positions", type=int, default=200)
+    parser.add_argument("--games", type=int, default=0, help="match games to play at equal time")
+    parser.add_argument("--move-time", type=float, default=0.5, help="seconds per move in the match")
+    args = parser.parse_args()
+
+    network = load_network(args.network) if args.network else network_from_classic()
+    positions = sample_positions(args.positions)
+    classic_rate, full_rate, incremental_rate = measure_speed(network, positions)
+    print(f"classic evaluation:      {classic_rate:10.0f} evals/s")
+    print(f"NNUE full refresh:       {full_rate:10.0f} evals/s")
+    print(f"NNUE incremental update: {incremental_rate:10.0f} evals/s")
+
+    if args.games:
+        score = play_match(network, args.games, args.move_time)
+        print(f"NNUE vs classic at {args.move_time}s/move: {score}/{args.games}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import re
+
+from movegen import Piece, is_checkmate, is_king_in_check, legal_moves, make_move, opponent, unmake_move
+
+FILES = "abcdefgh"
+PIECE_LETTERS = {"pawn": "P", "knight": "N", "bishop": "B", "rook": "R", "queen": "Q", "king": "K"}
+LETTER_PIECES = {letter: piece_type for piece_type, letter in PIECE_LETTERS.items()}
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1"
+
+
+def square_name(square):
+    row, col = square
+    return f"{FILES[col]}{8 - row}"
+
+
+def parse_square(name):
+    return 8 - int(name[1]), FILES.index(name[0])
+
+
+# FEN (castling and en passant fields are ignored: the game has neither)
+def board_from_fen(fen, make_piece=Piece):
+    """Return (board, player to move) for a FEN string."""
+    fields = fen.split()
+    rows = fields[0].split("/")
+    if len(rows) != 8:
+        raise ValueError(f"bad FEN: {fen!r}")
+    board = [[None for _ in range(8)] for _ in range(8)]
+    for row, text in enumerate(rows):
+        col = 0
+        for char in text:
+            if char.isdigit():
+                col += int(char)
+            else:
+                color = "white" if char.isupper() else "black"
+                board[row][col] = make_piece(color, LETTER_PIECES[char.upper()])
+                col += 1
+        if col != 8:
+            raise ValueError(f"bad FEN: {fen!r}")
+    player = "black" if len(fields) > 1 and fields[1] == "b" else "white"
+    return board, player
+
+
+def board_to_fen(board, player):
+    rows = []
+    for row in board:
+        text, empty = "", 0
+        for piece in row:
+            if piece is None:
+                empty += 1
+                continue
+            if empty:
+                text += str(empty)
+                empty = 0
+            letter = PIECE_LETTERS[piece.type]
+            text += letter if piece.color == "white" else letter.lower()
+        rows.append(text + (str(empty) if empty else ""))
+    return f"{'/'.join(rows)} {'w' if player == 'white' else 'b'} - - 0 1"
+
+
+# Standard algebraic notation, without the check suffix
+def _san_body(board, player, move):
+    start, end = move
+    piece = board[start[0]][start[1]]
+    capture = board[end[0]][end[1]] is not None
+    if piece.type == "pawn":
+        san = f"{FILES[start[1]]}x{square_name(end)}" if capture else square_name(end)
+        if end[0] == 0 or end[0] == 7:
+            san += "=Q"
+    else:
+        # Disambiguate between pieces of the same type that can reach the same square
+        rivals = [other for other, targets in legal_moves(board, player).items()
+                  if other != start and end in targets and board[other[0]][other[1]].type == piece.type]
+        prefix = ""
+        if rivals:
+            if all(other[1] != start[1] for other in rivals):
+                prefix = FILES[start[1]]
+            elif all(other[0] != start[0] for other in rivals):
+                prefix = str(8 - start[0])
+            else:
+                prefix = square_name(start)
+        san = f"{PIECE_LETTERS[piece.type]}{prefix}{'x' if capture else ''}{square_name(end)}"
+    return san
+
+
+def move_to_san(board, player, move):
+    start, end = move
+    san = _san_body(board, player, move)
+    undo = make_move(board, start, end)
+    try:
+        if is_king_in_check(board, opponent(player)):
+            san += "#" if is_checkmate(board, opponent(player)) else "+"
+    finally:
+        unmake_move(board, undo)
+    return san
+
+
+def _strip_san(san):
+    return san.rstrip("+#!?").replace("x", "").replace("=", "")
+
+
+def san_to_move(board, player, san):
+    """Return the (start, end) move ``san`` denotes; ValueError if it is illegal or unsupported."""
+    wanted = _strip_san(san)
+    if wanted.startswith("O-O") or wanted.startswith("0-0"):
+        raise ValueError(f"castling is not supported: {san}")
+    for start, targets in legal_moves(board, player).items():
+        for end in targets:
+            move = (start, end)
+            if _strip_san(_san_body(board, player, move)) == wanted:
+                return move
+    # Fall back to a fully qualified origin square, e.g. "Ng1f3"
+    match = re.fullmatch(r"[NBRQK]?([a-h][1-8])([a-h][1-8])Q?", wanted)
+    if match:
+        move = (parse_square(match.group(1)), parse_square(match.group(2)))
+        if move[1] in legal_moves(board, player).get(move[0], ()):
+            return move
+    raise ValueError(f"illegal or unsupported move: {san}")
+
+
+# PGN
+_TOKEN = re.compile(r"\{[^}]*\}|;[^\n]*|\$\d+|\d+\.(?:\.\.)?|1-0|0-1|1/2-1/2|\*|[()]|[^\s(){}]+")
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+
+
+class PGNGame:
+    def __init__(self, headers, moves, result="*"):
+        self.headers = headers
+        self.moves = moves  # SAN strings of the main line
+        self.result = result
+
+
+def read_pgn(stream):
+    """Yield PGNGame objects from a text stream, one game at a time; comments and variations are dropped."""
+    headers, movetext = {}, []
+    for line in stream:
+        line = line.strip()
+        if line.startswith("[") and line.endswith("]"):
+            if movetext:
+                yield _parse_movetext(headers, " ".join(movetext))
+                headers, movetext = {}, []
+            match = re.match(r'\[(\w+)\s+"(.*)"\]', line)
+            if match:
+                headers[match.group(1)] = match.group(2)
+        elif line:
+            movetext.append(line)
+    if movetext or headers:
+        yield _parse_movetext(headers, " ".join(movetext))
+
+
+def _parse_movetext(headers, text):
+    moves, depth, result = [], 0, headers.get("Result", "*")
+    for token in _TOKEN.findall(text):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth or token[0] in "{;$" or token[0].isdigit() and token.endswith("."):
+            continue
+        elif token in RESULTS:
+            result = token
+        else:
+            moves.append(token)
+    return PGNGame(headers, moves, result)
+
+
+def write_pgn(stream, headers, moves, result="*", comments=None):
+    """Write one game; ``comments`` maps a ply index to the comment placed after that move."""
+    headers = dict(headers)
+    headers["Result"] = result
+    for name, value in headers.items():
+        stream.write(f'[{name} "{value}"]\n')
+    stream.write("\n")
+    tokens = []
+    for ply, san in enumerate(moves):
+        if ply % 2 == 0:
+            tokens.append(f"{ply // 2 + 1}.")
+        tokens.append(san)
+        if comments and ply in comments:
+            tokens.append(f"{{{comments[ply]}}}")
+            if ply % 2 == 0 and ply + 1 < len(moves):
+                tokens.append(f"{ply // 2 + 1}...")
+    tokens.append(result)
+    line = ""
+    for token in tokens:
+        if line and len(line) + len(token) + 1 > 79:
+            stream.write(line + "\n")
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    stream.write(line + "\n\n")
@@ -0,0 +1,112 @@
+import sqlite3
+import time
+
+from evaluation import params_checksum
+from game_archive import ENGINE_VERSION, decode_move, encode_move
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+
+# Size checks and last-used updates are batched to keep lookups cheap
+EVICT_CHECK_INTERVAL = 256
+TOUCH_FLUSH_INTERVAL = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    hash INTEGER PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    move INTEGER NOT NULL,
+    engine_version INTEGER NOT NULL,
+    eval_params TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS positions_last_used ON positions (last_used);
+"""
+
+
+def _signed(key):
+    # SQLite integers are signed 64-bit; Zobrist hashes are unsigned
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+# Search results that survive between sessions
+class PositionCache:
+    """SQLite store of (depth, score, best move) per position hash, bounded to ``max_entries``.
+
+    The database runs in WAL mode so several engine processes can read it
+    while one writes. When it grows past ``max_entries`` the least recently
+    used positions are dropped. Entries from another ENGINE_VERSION, or
+    found with evaluation parameters other than the ones active when the
+    cache was opened, are ignored.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.db = sqlite3.connect(path, timeout=5.0)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(positions)")]
+        if "eval_params" not in columns:
+            # Caches written before the evaluation was part of the key; their entries never match
+            self.db.execute("ALTER TABLE positions ADD COLUMN eval_params TEXT NOT NULL DEFAULT ''")
+        self.eval_params = params_checksum()
+        self.touched = set()
+        self.puts = 0
+
+    def get(self, key, min_depth=0):
+        """Return (depth, score, (start, end)) for a position searched at least ``min_depth`` deep, else None."""
+        row = self.db.execute(
+            "SELECT depth, score, move FROM positions "
+            "WHERE hash = ? AND engine_version = ? AND eval_params = ? AND depth >= ?",
+            (_signed(key), ENGINE_VERSION, self.eval_params, min_depth),
+        ).fetchone()
+        if row is None:
+            return None
+        self.touched.add(_signed(key))
+        if len(self.touched) >= TOUCH_FLUSH_INTERVAL:
+            self._flush_touched()
+        depth, score, code = row
+        start, end, _ = decode_move(code)
+        return depth, score, (start, end)
+
+    def put(self, key, depth, score, move):
+        """Store a search result, keeping an existing deeper one."""
+        self.db.execute(
+            "INSERT INTO positions (hash, depth, score, move, engine_version, eval_params, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (hash) DO UPDATE SET depth = excluded.depth, score = excluded.score, move = excluded.move, "
+            "engine_version = excluded.engine_version, eval_params = excluded.eval_params, "
+            "last_used = excluded.last_used "
+            "WHERE excluded.depth >= positions.depth OR positions.engine_version != excluded.engine_version "
+            "OR positions.eval_params != excluded.eval_params",
+            (_signed(key), depth, score, encode_move(*move), ENGINE_VERSION, self.eval_params, time.time()),
+        )
+        self.puts += 1
+        if self.puts % EVICT_CHECK_INTERVAL == 0:
+            self._evict()
+        self._flush_touched()
+
+    def _flush_touched(self):
+        if self.touched:
+            now = time.time()
+            self.db.executemany("UPDATE positions SET last_used = ? WHERE hash = ?", [(now, key) for key in self.touched])
+            self.touched.clear()
+        self.db.commit()
+
+    def _evict(self):
+        (count,) = self.db.execute("SELECT count(*) FROM positions").fetchone()
+        if count > self.max_entries:
+            self.db.execute(
+                "DELETE FROM positions WHERE hash IN (SELECT hash FROM positions ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def __len__(self):
+        return self.db.execute("SELECT count(*) FROM positions").fetchone()[0]
+
+    def close(self):
+        self._evict()
+        self._flush_touched()
+        self.db.close()
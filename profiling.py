@@ -0,0 +1,155 @@
+import cProfile
+import json
+import marshal
+import time
+
+# Hot-path counters every profile reports, even when they stay at zero
+COUNTERS = ("movegen", "legality_checks", "king_in_check", "nodes", "tt_hits", "tt_cutoffs")
+
+# Upper bounds (in milliseconds) of the frame-time histogram buckets
+FRAME_BUCKETS_MS = (4, 8, 16, 33, 50, 100, 250)
+
+
+class _Timer:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add_time(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+# Engine and render loop instrumentation
+class Profiler:
+    """Counters, phase timers and frame histograms that can be switched on and off while running.
+
+    Hot paths guard every call with ``if profiler.enabled:`` so a disabled
+    profiler costs a single attribute lookup.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._cprofile = None
+        self.reset()
+
+    def reset(self):
+        if self._cprofile is not None:
+            self._cprofile.clear()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.timers = {}  # name -> [calls, total seconds]
+        self.histograms = {}  # name -> counts per FRAME_BUCKETS_MS bucket, plus one overflow bucket
+
+    def enable(self, cprofile=False):
+        """Start collecting. With ``cprofile`` the interpreter-level cProfile hook is attached too."""
+        self.enabled = True
+        if cprofile and self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    def disable(self):
+        self.enabled = False
+        if self._cprofile is not None:
+            self._cprofile.disable()
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        return self.enabled
+
+    def incr(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def timer(self, name):
+        """Context manager that adds the elapsed time of its block to the ``name`` phase."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def add_time(self, name, seconds):
+        entry = self.timers.get(name)
+        if entry is None:
+            self.timers[name] = [1, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    def record_frame(self, seconds, name="frame"):
+        buckets = self.histograms.get(name)
+        if buckets is None:
+            buckets = self.histograms[name] = [0] * (len(FRAME_BUCKETS_MS) + 1)
+        ms = seconds * 1000.0
+        for i, bound in enumerate(FRAME_BUCKETS_MS):
+            if ms <= bound:
+                buckets[i] += 1
+                break
+        else:
+            buckets[-1] += 1
+        self.add_time(name, seconds)
+
+    def snapshot(self):
+        """Return everything collected so far as plain JSON-serialisable data."""
+        return {
+            "counters": dict(self.counters),
+            "timers": {
+                name: {"calls": calls, "total_s": total, "mean_ms": total * 1000.0 / calls}
+                for name, (calls, total) in self.timers.items()
+            },
+            "histograms": {
+                name: {
+                    "bucket_ms": list(FRAME_BUCKETS_MS) + [None],
+                    "counts": list(counts),
+                }
+                for name, counts in self.histograms.items()
+            },
+        }
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+
+    def dump_stats(self, path):
+        """Write a file that ``pstats.Stats(path)`` can load.
+
+        If cProfile was attached the file holds its call data only: phase time
+        is already inside those functions and would otherwise be counted twice.
+        Without cProfile, phase timers and counters appear as pseudo-functions
+        in the ``profiling`` file; phases may nest (a frame contains its draw
+        phases), so their total is not wall time. export_json() has the phases
+        either way.
+        """
+        if self._cprofile is not None:
+            self._cprofile.create_stats()
+            stats = dict(self._cprofile.stats)
+            if self.enabled:
+                self._cprofile.enable()
+        else:
+            stats = {}
+            for name, (calls, total) in self.timers.items():
+                stats[("profiling", 0, f"<phase {name}>")] = (calls, calls, total, total, {})
+            for name, count in self.counters.items():
+                stats[("profiling", 0, f"<counter {name}>")] = (count, count, 0.0, 0.0, {})
+        with open(path, "wb") as f:
+            marshal.dump(stats, f)
+
+
+# Shared instance used by the game and the engine
+profiler = Profiler()
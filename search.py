@@ -0,0 +1,343 @@
+import random
+import time
+
+from evaluation import evaluate
+from movegen import get_valid_moves, is_king_in_check, make_move, opponent, position_hash, unmake_move
+from profiling import profiler
+
+MATE_SCORE = 100000
+MATE_BOUND = MATE_SCORE - 1000  # Scores beyond this are mates
+INFINITY = 10 ** 9
+
+# Values used to order captures, most valuable victim first
+ORDER_VALUES = {"pawn": 1, "knight": 3, "bishop": 3, "rook": 5, "queen": 9, "king": 100}
+
+# Selective search margins (centipawns), indexed by remaining depth
+FUTILITY_MARGINS = (0, 200, 500)
+RAZOR_MARGINS = (0, 300, 550)
+
+# Late-move reductions apply from this move on, and grow by a ply from LMR_DEEP_MOVE on
+LMR_FIRST_MOVE = 3
+LMR_DEEP_MOVE = 8
+LMR_MIN_DEPTH = 3
+
+NULL_MOVE_MIN_DEPTH = 3
+
+# Nodes between clock reads; at this engine's speed a few tens of milliseconds
+TIME_CHECK_INTERVAL = 256
+
+# Transposition table entry bounds
+EXACT, LOWER_BOUND, UPPER_BOUND = range(3)
+
+
+# Raised inside the search when its time or node budget runs out
+class SearchTimeout(Exception):
+    pass
+
+
+# Switches for the selective parts of the search, so each one's effect can be measured
+class SearchOptions:
+    def __init__(self, null_move=True, late_move_reductions=True, futility=True, razoring=True,
+                 check_extensions=True, transposition_table=True, tt_entries=1 << 20):
+        self.null_move = null_move
+        self.late_move_reductions = late_move_reductions
+        self.futility = futility
+        self.razoring = razoring
+        self.check_extensions = check_extensions
+        self.transposition_table = transposition_table
+        self.tt_entries = tt_entries
+
+
+# Static evaluation through evaluation.evaluate; holds no state between moves
+class ClassicEvaluator:
+    def reset(self, board):
+        pass
+
+    def make(self, board, start, end):
+        return make_move(board, start, end)
+
+    def unmake(self, board, undo):
+        unmake_move(board, undo)
+
+    def evaluate(self, board):
+        return evaluate(board)
+
+
+# All legal moves for a side, captures first (most valuable victim, least valuable attacker)
+def generate_moves(board, color):
+    captures, quiet = [], []
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece and piece.color == color:
+                for end in get_valid_moves(piece, row, col, board):
+                    target = board[end[0]][end[1]]
+                    if target:
+                        captures.append((ORDER_VALUES[target.type] * 10 - ORDER_VALUES[piece.type], (row, col), end))
+                    else:
+                        quiet.append(((row, col), end))
+    captures.sort(key=lambda move: move[0], reverse=True)
+    return [(start, end) for _, start, end in captures] + quiet
+
+
+# Null-move guard: zugzwang is common when a side has only king and pawns
+def has_non_pawn_material(board, color):
+    for row in board:
+        for piece in row:
+            if piece and piece.color == color and piece.type not in ("pawn", "king"):
+                return True
+    return False
+
+
+def _is_promotion(board, start, end):
+    return board[start[0]][start[1]].type == "pawn" and (end[0] == 0 or end[0] == 7)
+
+
+# Mate scores are stored relative to the node so they stay valid at other plies
+def _to_tt(score, ply):
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def _from_tt(score, ply):
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+# Iterative-deepening alpha-beta search
+class Search:
+    """Principal-variation alpha-beta search over the shared move generator.
+
+    ``evaluator`` provides reset/make/unmake/evaluate (see ClassicEvaluator)
+    and ``options`` selects the pruning, reduction and extension techniques.
+    Scores are centipawns from the side to move's point of view.
+    """
+
+    def __init__(self, evaluator=None, rng=None, options=None):
+        self.evaluator = evaluator or ClassicEvaluator()
+        self.rng = rng or random.Random()
+        self.options = options or SearchOptions()
+        self.tt = {}  # position hash -> (depth, score, bound, best move); kept between searches
+        self.nodes = 0
+        self.depth_times = []  # Seconds from the start of the search until each depth completed
+        self.deadline = None
+        self.max_nodes = None
+        self._next_time_check = 0
+
+    def search(self, board, player, depth=4, time_limit=None, max_nodes=None, root_moves=None):
+        """Return (best move, score, depth reached); the move is None when there is no legal move.
+
+        The search stops at ``depth``, after ``time_limit`` seconds or once
+        ``max_nodes`` nodes were visited, whichever comes first. ``root_moves``
+        restricts the moves considered at the root.
+        """
+        started = time.perf_counter()
+        self.nodes = 0
+        self.depth_times = []
+        self.deadline = started + time_limit if time_limit else None
+        self.max_nodes = max_nodes
+        self._next_time_check = TIME_CHECK_INTERVAL
+        if len(self.tt) > self.options.tt_entries:
+            self.tt.clear()
+        self.evaluator.reset(board)
+        legal = generate_moves(board, player)
+        root_moves = [move for move in legal if move in root_moves] if root_moves is not None else legal
+        if not root_moves:
+            return None, self._no_moves_score(board, player, 0), 0
+        self.rng.shuffle(root_moves)  # Equal moves are chosen at random
+        best_move, best_score, reached = root_moves[0], -INFINITY, 0
+        for current_depth in range(1, depth + 1):
+            try:
+                move, score = self._search_root(board, player, root_moves, current_depth)
+            except SearchTimeout:
+                break
+            best_move, best_score, reached = move, score, current_depth
+            self.depth_times.append(time.perf_counter() - started)
+            # Search the previous best move first on the next iteration
+            root_moves.remove(move)
+            root_moves.insert(0, move)
+            if abs(score) > MATE_BOUND:
+                break
+        return best_move, best_score, reached
+
+    def multipv(self, board, player, lines, depth=4, time_limit=None, max_nodes=None):
+        """Return up to ``lines`` (move, score, depth reached) tuples for the best distinct root moves.
+
+        Each line gets its own time and node budget; a line whose budget ran
+        out before depth 1 completed is not reported. ``nodes`` holds the
+        total over all lines afterwards.
+        """
+        remaining = generate_moves(board, player)
+        results = []
+        total_nodes = 0
+        while remaining and len(results) < lines:
+            move, score, reached = self.search(board, player, depth, time_limit, max_nodes, remaining)
+            total_nodes += self.nodes
+            if move is None or not reached:
+                break
+            results.append((move, score, reached))
+            remaining.remove(move)
+        self.nodes = total_nodes
+        return results
+
+    def _search_root(self, board, player, moves, depth):
+        alpha, beta = -INFINITY, INFINITY
+        best_move = moves[0]
+        for i, (start, end) in enumerate(moves):
+            undo = self.evaluator.make(board, start, end)
+            try:
+                if i == 0:
+                    score = -self._negamax(board, opponent(player), depth - 1, -beta, -alpha, 1)
+                else:
+                    score = -self._negamax(board, opponent(player), depth - 1, -alpha - 1, -alpha, 1)
+                    if score > alpha:
+                        score = -self._negamax(board, opponent(player), depth - 1, -beta, -alpha, 1)
+            finally:
+                self.evaluator.unmake(board, undo)
+            if score > alpha:
+                alpha, best_move = score, (start, end)
+        return best_move, alpha
+
+    def _static_eval(self, board, player):
+        score = self.evaluator.evaluate(board)
+        return score if player == "white" else -score
+
+    # Count a node for both search and quiescence, and stop once the node or time budget is spent
+    def _count_node(self):
+        self.nodes += 1
+        if profiler.enabled:
+            profiler.incr("nodes")
+        if self.max_nodes and self.nodes >= self.max_nodes:
+            raise SearchTimeout
+        if self.deadline and self.nodes >= self._next_time_check:
+            self._next_time_check = self.nodes + TIME_CHECK_INTERVAL
+            if time.perf_counter() > self.deadline:
+                raise SearchTimeout
+
+    def _negamax(self, board, player, depth, alpha, beta, ply, allow_null=True):
+        self._count_node()
+        options = self.options
+        in_check = is_king_in_check(board, player)
+        if in_check and options.check_extensions:
+            depth += 1
+        if depth <= 0:
+            return self._quiescence(board, player, alpha, beta, ply)
+
+        original_alpha = alpha
+        key = tt_move = None
+        if options.transposition_table:
+            key = position_hash(board, player)
+            entry = self.tt.get(key)
+            if entry is not None:
+                if profiler.enabled:
+                    profiler.incr("tt_hits")
+                entry_depth, entry_score, bound, tt_move = entry
+                if entry_depth >= depth:
+                    entry_score = _from_tt(entry_score, ply)
+                    if (bound == EXACT or (bound == LOWER_BOUND and entry_score >= beta)
+                            or (bound == UPPER_BOUND and entry_score <= alpha)):
+                        if profiler.enabled:
+                            profiler.incr("tt_cutoffs")
+                        return entry_score
+
+        static_eval = None
+        if not in_check and (options.razoring or options.futility or options.null_move):
+            static_eval = self._static_eval(board, player)
+
+        # Razoring: far below alpha near the leaves, only captures can save the node
+        if options.razoring and not in_check and depth < len(RAZOR_MARGINS) and static_eval + RAZOR_MARGINS[depth] <= alpha:
+            score = self._quiescence(board, player, alpha, beta, ply)
+            if depth == 1 or score <= alpha:
+                return score
+
+        # Null move: if passing still beats beta, a real move will too (not in check, pawn endings or twice in a row)
+        if (options.null_move and allow_null and not in_check and depth >= NULL_MOVE_MIN_DEPTH
+                and static_eval >= beta and abs(beta) < MATE_BOUND and has_non_pawn_material(board, player)):
+            reduction = 3 if depth > 6 else 2
+            score = -self._negamax(board, opponent(player), depth - 1 - reduction, -beta, -beta + 1, ply + 1, False)
+            if score >= beta:
+                return beta
+
+        moves = generate_moves(board, player)
+        if not moves:
+            return self._no_moves_score(board, player, ply)
+        if tt_move in moves:
+            moves.remove(tt_move)
+            moves.insert(0, tt_move)
+
+        # Futility: near the leaves, quiet moves cannot lift a hopeless static score above alpha
+        futile = (options.futility and not in_check and depth < len(FUTILITY_MARGINS)
+                  and static_eval + FUTILITY_MARGINS[depth] <= alpha)
+
+        best_score, best_move = -INFINITY, None
+        for i, (start, end) in enumerate(moves):
+            quiet = board[end[0]][end[1]] is None and not _is_promotion(board, start, end)
+            undo = self.evaluator.make(board, start, end)
+            try:
+                prune = futile and quiet and i > 0
+                reduce = (options.late_move_reductions and quiet and not in_check
+                          and depth >= LMR_MIN_DEPTH and i >= LMR_FIRST_MOVE)
+                # Checking moves are never pruned or reduced
+                if (prune or reduce) and is_king_in_check(board, opponent(player)):
+                    prune = reduce = False
+                if prune:
+                    continue
+                reduction = 0
+                if reduce:
+                    reduction = 2 if i >= LMR_DEEP_MOVE and depth > 4 else 1
+                if i == 0:
+                    score = -self._negamax(board, opponent(player), depth - 1, -beta, -alpha, ply + 1)
+                else:
+                    score = -self._negamax(board, opponent(player), depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)
+                    if score > alpha and (reduction or score < beta):
+                        score = -self._negamax(board, opponent(player), depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                self.evaluator.unmake(board, undo)
+            if score > best_score:
+                best_score, best_move = score, (start, end)
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best_move is None:
+            return alpha  # Every move was pruned as futile
+        if key is not None:
+            if best_score <= original_alpha:
+                bound = UPPER_BOUND
+            elif best_score >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            self.tt[key] = (depth, _to_tt(best_score, ply), bound, best_move)
+        return best_score
+
+    # Resolve captures at the horizon so the static evaluation is taken in a quiet position
+    def _quiescence(self, board, player, alpha, beta, ply):
+        stand_pat = self._static_eval(board, player)
+        if stand_pat >= beta:
+            return beta
+        alpha = max(alpha, stand_pat)
+        for start, end in generate_moves(board, player):
+            if board[end[0]][end[1]] is None:
+                break  # Captures come first; the rest are quiet moves
+            self._count_node()
+            undo = self.evaluator.make(board, start, end)
+            try:
+                score = -self._quiescence(board, opponent(player), -beta, -alpha, ply + 1)
+            finally:
+                self.evaluator.unmake(board, undo)
+            if score >= beta:
+                return beta
+            alpha = max(alpha, score)
+        return alpha
+
+    def _no_moves_score(self, board, player, ply):
+        # Checkmate is scored so that shorter mates are preferred; stalemate is a draw
+        return -MATE_SCORE + ply if is_king_in_check(board, player) else 0
@@ -0,0 +1,208 @@
+"""Tune piece values and piece-square tables against self-play results (Texel's method).
+
+Positions from the game archive are turned into feature matrices once, then
+the evaluation weights are fitted by minimising the squared error between
+each game's result and the sigmoid of the evaluation, using minibatch Adam
+steps over whole NumPy arrays.
+
+    python texel_tuner.py games.chessarc --cache features.npz --epochs 30
+"""
+import argparse
+import math
+import time
+
+import numpy as np
+
+import evaluation
+from game_archive import RESULT_BLACK_WINS, RESULT_DRAW, RESULT_UNKNOWN, RESULT_WHITE_WINS, ArchiveReader
+from movegen import PIECE_TYPES
+
+# Score (from white's point of view) each result teaches
+RESULT_LABELS = {RESULT_WHITE_WINS: 1.0, RESULT_BLACK_WINS: 0.0, RESULT_DRAW: 0.5}
+
+MAX_PIECES = 32
+PST_SIZE = len(PIECE_TYPES) * 64
+
+# Feature index of each piece on each square: type * 64 + square, mirrored for black
+_FEATURE = {}
+for _t, _piece_type in enumerate(PIECE_TYPES):
+    _FEATURE[("white", _piece_type)] = [[_t * 64 + row * 8 + col for col in range(8)] for row in range(8)]
+    _FEATURE[("black", _piece_type)] = [[_t * 64 + (7 - row) * 8 + col for col in range(8)] for row in range(8)]
+
+
+# Turn archived positions into feature matrices
+def extract_features(archive_path, skip_plies=8, max_positions=None):
+    """Return (features, signs, labels).
+
+    ``features`` is an (N, 32) uint16 matrix of piece-square feature indices
+    and ``signs`` the matching int8 matrix of +1 (white), -1 (black) or 0
+    (padding). Openings shorter than ``skip_plies`` and unfinished games are
+    left out.
+    """
+    capacity = 1 << 16
+    features = np.zeros((capacity, MAX_PIECES), dtype=np.uint16)
+    signs = np.zeros((capacity, MAX_PIECES), dtype=np.int8)
+    labels = np.zeros(capacity, dtype=np.float32)
+    n = 0
+    with ArchiveReader(archive_path) as archive:
+        for record, ply, board, _ in archive.iter_positions():
+            if record.result == RESULT_UNKNOWN or ply < skip_plies:
+                continue
+            if n == capacity:
+                capacity *= 2
+                features = np.resize(features, (capacity, MAX_PIECES))
+                signs = np.resize(signs, (capacity, MAX_PIECES))
+                labels = np.resize(labels, capacity)
+            row_features, row_signs = features[n], signs[n]
+            row_signs[:] = 0
+            i = 0
+            for row in range(8):
+                for col in range(8):
+                    piece = board[row][col]
+                    if piece and i < MAX_PIECES:
+                        row_features[i] = _FEATURE[(piece.color, piece.type)][row][col]
+                        row_signs[i] = 1 if piece.color == "white" else -1
+                        i += 1
+            labels[n] = RESULT_LABELS[record.result]
+            n += 1
+            if max_positions and n >= max_positions:
+                break
+    return features[:n], signs[:n], labels[:n]
+
+
+def save_features(path, features, signs, labels):
+    np.savez(path, features=features, signs=signs, labels=labels)
+
+
+def load_features(path):
+    data = np.load(path)
+    return data["features"], data["signs"], data["labels"]
+
+
+# Weights <-> evaluation parameters
+def initial_weights():
+    """Return (piece values, flattened piece-square tables) from the engine's current evaluation."""
+    values = np.array([evaluation.PIECE_VALUES[t] for t in PIECE_TYPES], dtype=np.float64)
+    pst = np.array([evaluation.PST[t] for t in PIECE_TYPES], dtype=np.float64).reshape(PST_SIZE)
+    return values, pst
+
+
+def evaluate_batch(features, signs, values, pst):
+    """Evaluations of a batch of positions, in centipawns from white's point of view."""
+    table = pst + np.repeat(values, 64)
+    return (signs * table[features]).sum(axis=1)
+
+
+def _sigmoid(scores, k):
+    return 1.0 / (1.0 + np.power(10.0, -k * scores / 400.0))
+
+
+def dataset_error(features, signs, labels, values, pst, k, batch_size=1 << 18):
+    total = 0.0
+    for start in range(0, len(labels), batch_size):
+        end = start + batch_size
+        scores = evaluate_batch(features[start:end], signs[start:end], values, pst)
+        total += float(np.square(labels[start:end] - _sigmoid(scores, k)).sum())
+    return total / max(1, len(labels))
+
+
+# Find the sigmoid scale that best fits the current weights
+def fit_scale(features, signs, labels, values, pst, lo=0.1, hi=3.0, iterations=30):
+    golden = (math.sqrt(5) - 1) / 2
+    a, b = hi - golden * (hi - lo), lo + golden * (hi - lo)
+    fa = dataset_error(features, signs, labels, values, pst, a)
+    fb = dataset_error(features, signs, labels, values, pst, b)
+    for _ in range(iterations):
+        if fa < fb:
+            hi, b, fb = b, a, fa
+            a = hi - golden * (hi - lo)
+            fa = dataset_error(features, signs, labels, values, pst, a)
+        else:
+            lo, a, fa = a, b, fb
+            b = lo + golden * (hi - lo)
+            fb = dataset_error(features, signs, labels, values, pst, b)
+    return (lo + hi) / 2
+
+
+def tune(features, signs, labels, values, pst, k, epochs=30, batch_size=1 << 16, learning_rate=2.0, seed=0):
+    """Minimise the Texel error with minibatch Adam; return the tuned (values, pst)."""
+    rng = np.random.default_rng(seed)
+    params = np.concatenate([values, pst])
+    m = np.zeros_like(params)
+    v = np.zeros_like(params)
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    # King value is not tunable: both kings are always on the board
+    frozen = np.zeros_like(params, dtype=bool)
+    frozen[PIECE_TYPES.index("king")] = True
+    scale = k * math.log(10) / 400.0
+    step = 0
+    n = len(labels)
+    for epoch in range(epochs):
+        order = rng.permutation(n)
+        for start in range(0, n, batch_size):
+            batch = order[start:start + batch_size]
+            f, s, y = features[batch], signs[batch], labels[batch]
+            values, pst = params[:len(PIECE_TYPES)], params[len(PIECE_TYPES):]
+            p = _sigmoid(evaluate_batch(f, s, values, pst), k)
+            # d(error)/d(score) for every position in the batch
+            g = (-2.0 * scale / len(batch)) * (y - p) * p * (1.0 - p)
+            grad_table = np.bincount(f.ravel(), weights=(s * g[:, None]).ravel(), minlength=PST_SIZE)
+            grad = np.concatenate([grad_table.reshape(len(PIECE_TYPES), 64).sum(axis=1), grad_table])
+            grad[frozen] = 0.0
+            step += 1
+            m = beta1 * m + (1 - beta1) * grad
+            v = beta2 * v + (1 - beta2) * grad * grad
+            m_hat = m / (1 - beta1 ** step)
+            v_hat = v / (1 - beta2 ** step)
+            params -= learning_rate * m_hat / (np.sqrt(v_hat) + eps)
+        values, pst = params[:len(PIECE_TYPES)], params[len(PIECE_TYPES):]
+        error = dataset_error(features, signs, labels, values, pst, k)
+        print(f"epoch {epoch + 1}/{epochs}: error {error:.6f}")
+    return params[:len(PIECE_TYPES)].copy(), params[len(PIECE_TYPES):].copy()
+
+
+# Write tuned weights in the format evaluation.load_params reads
+def write_params(path, values, pst):
+    piece_values = {t: int(round(v)) for t, v in zip(PIECE_TYPES, values)}
+    tables = pst.reshape(len(PIECE_TYPES), 8, 8)
+    pst_out = {t: [[int(round(x)) for x in row] for row in tables[i]] for i, t in enumerate(PIECE_TYPES)}
+    evaluation.save_params(path, piece_values, pst_out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("archive", nargs="?", help="game archive to read positions from")
+    parser.add_argument("--cache", help="feature file (.npz); built from the archive when missing")
+    parser.add_argument("--out", default=evaluation.EVAL_PARAMS_PATH, help="where to write the tuned parameters")
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--batch-size", type=int, default=1 << 16)
+    parser.add_argument("--learning-rate", type=float, default=2.0)
+    parser.add_argument("--skip-plies", type=int, default=8)
+    parser.add_argument("--max-positions", type=int)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        if not args.cache:
+            raise FileNotFoundError
+        features, signs, labels = load_features(args.cache)
+    except FileNotFoundError:
+        if not args.archive:
+            parser.error("an archive is needed to build the features")
+        features, signs, labels = extract_features(args.archive, args.skip_plies, args.max_positions)
+        if args.cache:
+            save_features(args.cache, features, signs, labels)
+    print(f"{len(labels)} positions loaded in {time.perf_counter() - start:.1f}s")
+    if not len(labels):
+        return
+
+    values, pst = initial_weights()
+    k = fit_scale(features, signs, labels, values, pst)
+    print(f"scale K = {k:.3f}, initial error {dataset_error(features, signs, labels, values, pst, k):.6f}")
+    values, pst = tune(features, signs, labels, values, pst, k, args.epochs, args.batch_size, args.learning_rate)
+    write_params(args.out, values, pst)
+    print(f"tuned parameters written to {args.out} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()